@@ -0,0 +1,211 @@
+import sys
+from argparse import ArgumentParser
+from json import dump as dump_json
+from os.path import basename
+from time import perf_counter
+
+from cgameengine import CGameEngine
+from cgamedata import DATA_PATH
+from csimulation import POLICIES, create_game, run_jobs
+
+TICKS_PER_SECOND = 40
+"""
+Engine steps per second of game time, see CGameScreen.start_timer().
+"""
+
+COUNTERS = ("ticks", "fragments", "molecules", "atoms", "points", "bonuses", "bonus_hits", "bonus_points")
+"""
+Per-level counters of a game, see analyze_game().
+"""
+
+
+def get_level(nr_molecules: int):
+    """
+    Gets the level for a number of completed molecules, as displayed in the game.
+    :param nr_molecules: Number of completed molecules.
+    :return: Level, starting with 1.
+    """
+    return nr_molecules // 10 + 1
+
+
+def analyze_game(job: dict):
+    """
+    Runs a headless game and counts per level: steps, spawned fragments, completed molecules and their atoms and
+    points, offered bonus molecules, and bonus hits with their points. Requires csimulation.init_worker() before.
+    :param job: Job dict, see csimulation.simulate_game(). The start level is set by nr_molecules.
+    :return: Dict with the job and the result: time, score, nr_molecules, over, and levels (dict of counter dicts by
+    level).
+    """
+    engine, policy = create_game(job)
+    ticks = job.get("ticks", 0)
+    levels = {}
+    bonus = engine.bonus
+
+    while (not engine.over) and ((not ticks) or (engine.time < ticks)):
+        level = get_level(engine.nr_molecules)
+        counters = levels.get(level)
+        if counters is None:
+            counters = dict.fromkeys(COUNTERS, 0)
+            levels.update({level: counters})
+
+        events = engine.step(policy.get_inputs(engine))
+        counters["ticks"] += 1
+
+        # New bonus molecule
+        if (engine.bonus is not bonus) and engine.bonus.molecule:
+            counters["bonuses"] += 1
+        bonus = engine.bonus
+
+        # Spawned fragments and completed molecules
+        for event in events:
+            if event["type"] == "spawn":
+                counters["fragments"] += 1
+            elif event["type"] == "explode":
+                counters["molecules"] += 1
+                counters["atoms"] += len(event["molecule"].get_atom_positions())
+                counters["points"] += event["value"]
+                if event["bonus"]:
+                    counters["bonus_hits"] += 1
+                    counters["bonus_points"] += event["bonus"]
+
+    result = dict(job)
+    result.update({"time": engine.time, "score": engine.score, "nr_molecules": engine.nr_molecules,
+                   "over": engine.over, "levels": levels})
+    return result
+
+
+def aggregate(results: list[dict]):
+    """
+    Aggregates game results by start level and by played level.
+    :param results: List of results, see analyze_game().
+    :return: Dict of report dicts by level with:
+    games (started at this level), game_over_rate, mean_ticks_to_game_over (None if no game over), levels_gained (mean
+    number of levels a game advanced), ticks (played at this level), completion_rate (completed molecules per spawned
+    fragment), mean_molecule_size (atoms), molecules_per_minute, bonus_hit_rate (hits per offered bonus molecule),
+    and points_per_minute.
+    """
+    # Step 1: Sum up
+    started = {}
+    played = {}
+    for result in results:
+        start_level = get_level(result.get("nr_molecules_start", 0))
+        games = started.setdefault(start_level, {"games": 0, "over": 0, "ticks_to_game_over": 0, "levels_gained": 0})
+        games["games"] += 1
+        games["levels_gained"] += get_level(result["nr_molecules"]) - start_level
+        if result["over"]:
+            games["over"] += 1
+            games["ticks_to_game_over"] += result["time"]
+
+        for level, counters in result["levels"].items():
+            totals = played.setdefault(level, dict.fromkeys(COUNTERS, 0))
+            for key, value in counters.items():
+                totals[key] += value
+
+    # Step 2: Rates
+    report = {}
+    for level in sorted(set(started) | set(played)):
+        games = started.get(level, {"games": 0, "over": 0, "ticks_to_game_over": 0, "levels_gained": 0})
+        totals = played.get(level, dict.fromkeys(COUNTERS, 0))
+        minutes = totals["ticks"] / TICKS_PER_SECOND / 60
+        report.update({level: {
+            "games": games["games"],
+            "game_over_rate": games["over"] / games["games"] if games["games"] else None,
+            "mean_ticks_to_game_over": games["ticks_to_game_over"] / games["over"] if games["over"] else None,
+            "levels_gained": games["levels_gained"] / games["games"] if games["games"] else None,
+            "ticks": totals["ticks"],
+            "completion_rate": totals["molecules"] / totals["fragments"] if totals["fragments"] else None,
+            "mean_molecule_size": totals["atoms"] / totals["molecules"] if totals["molecules"] else None,
+            "molecules_per_minute": totals["molecules"] / minutes if minutes else None,
+            "bonus_hit_rate": totals["bonus_hits"] / totals["bonuses"] if totals["bonuses"] else None,
+            "points_per_minute": (totals["points"] + totals["bonus_points"]) / minutes if minutes else None}})
+    return report
+
+
+def format_report(report: dict):
+    """
+    Formats a report as text table, see aggregate().
+    :param report: Dict of report dicts by level.
+    :return: List of lines.
+    """
+    columns = (("level", None, "{}"),
+               ("games", "games", "{}"),
+               ("over", "game_over_rate", "{:.0%}"),
+               ("to over [s]", "mean_ticks_to_game_over", "{:.1f}"),
+               ("+levels", "levels_gained", "{:.2f}"),
+               ("complete", "completion_rate", "{:.1%}"),
+               ("atoms", "mean_molecule_size", "{:.1f}"),
+               ("mol/min", "molecules_per_minute", "{:.1f}"),
+               ("bonus", "bonus_hit_rate", "{:.1%}"),
+               ("pts/min", "points_per_minute", "{:.0f}"))
+
+    lines = ["  ".join("{:>11}".format(title) for title, key, fmt in columns)]
+    for level, data in report.items():
+        cells = []
+        for title, key, fmt in columns:
+            value = level if key is None else data[key]
+            if key == "mean_ticks_to_game_over" and value is not None:
+                value /= TICKS_PER_SECOND
+            cells.append("{:>11}".format("-" if value is None else fmt.format(value)))
+        lines.append("  ".join(cells))
+    return lines
+
+
+def main(argv=None):
+    """
+    Command line entry point for the balance analysis, e.g.:
+    python chon.py --analyze --games 200 --levels 1 2 3 4 5 --fragments fragments.json --bonus bonus.json
+    :param argv: Command line arguments (without program name).
+    :return: Exit code.
+    """
+    parser = ArgumentParser(prog="chon.py --analyze",
+                            description="Monte Carlo difficulty and balance analysis of fragments and bonus molecules.")
+    parser.add_argument("--analyze", action="store_true", help="run the analysis (default)")
+    parser.add_argument("--games", type=int, default=100, help="number of games per start level")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 3, 4, 5], help="start levels")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game, then incremented")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="bot", help="input policy")
+    parser.add_argument("--ticks", type=int, default=10 * 60 * TICKS_PER_SECOND,
+                        help="tick limit per game (default: 10 minutes of game time)")
+    parser.add_argument("--processes", type=int, help="number of worker processes (default: number of cores)")
+    parser.add_argument("--data", default=DATA_PATH, help="path to the game data (default: data folder)")
+    parser.add_argument("--fragments", default="fragments.json", help="fragments file, relative to --data")
+    parser.add_argument("--bonus", default="bonus.json", help="bonus molecules file, relative to --data")
+    parser.add_argument("--cols", type=int, default=CGameEngine.COLS, help="reactor columns")
+    parser.add_argument("--rows", type=int, default=CGameEngine.ROWS, help="reactor rows")
+    parser.add_argument("--json", help="also write the report to a json file")
+    args = parser.parse_args(argv)
+
+    if args.policy == "scripted":
+        parser.error("the scripted policy isn't supported for the analysis")
+    if min(args.levels) < 1:
+        parser.error("levels start with 1")
+    if not ((1 <= args.cols <= CGameEngine.MAX_COLS) and (1 <= args.rows <= CGameEngine.MAX_ROWS)):
+        parser.error("reactor dimension must be 1..{}x1..{}".format(CGameEngine.MAX_COLS, CGameEngine.MAX_ROWS))
+
+    jobs = []
+    seed = args.seed
+    for level in args.levels:
+        for _ in range(args.games):
+            nr_molecules = (level - 1) * 10
+            jobs.append({"seed": seed, "policy": args.policy, "ticks": args.ticks, "cols": args.cols,
+                         "rows": args.rows, "nr_molecules": nr_molecules, "nr_molecules_start": nr_molecules})
+            seed += 1
+
+    t = perf_counter()
+    results = list(run_jobs(jobs, args.processes, args.data, args.fragments, args.bonus, worker=analyze_game))
+    seconds = perf_counter() - t
+    report = aggregate(results)
+
+    print("{} / {}: {} games, {} policy, {:.1f} s".format(basename(args.fragments), basename(args.bonus), len(jobs),
+                                                          args.policy, seconds))
+    for line in format_report(report):
+        print(line)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf8") as write_file:
+            dump_json({"settings": vars(args), "report": report}, write_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,17 +1,175 @@
-class CAtom:
-    def __init__(self, symbol: str, name: str, rgba: list[float], bonds: int | dict[str, list[int]]):
+class CElement:
+    """
+    Immutable data of a chemical element. CElement objects are flyweights shared by all atoms of the same element, see
+    CElement.table.
+    """
+    __slots__ = ("symbol", "name", "rgba", "bonds", "state")
+
+    table: dict = {}
+    """
+    Flyweight table of all known elements by symbol.
+    """
+
+    def __init__(self, symbol: str, name: str, rgba: tuple[float, float, float, float], bonds: int):
         """
-        Creates an atom object.
+        Creates an element object. Use CElement.get() to get the shared element object instead.
         :param symbol: Chemical symbol.
-        :param name: Atom name.
-        :param rgba: Color as RGBA [0.0..1.0, 0.0..1.0, 0.0..1.0, 0.0..1.0].
-        :param bonds: Either the number of bonds 1..4 or a dict with lists of free and bound electrons for each direction.
+        :param name: Element name.
+        :param rgba: Color as RGBA (0.0..1.0, 0.0..1.0, 0.0..1.0, 0.0..1.0).
+        :param bonds: Number of bonds 1..4.
         """
         self.symbol = symbol
         self.name = name
-        self.rgba = rgba
-        self.bonds = {"free": [1 if i < bonds else 0 for i in range(4)],
-                      "bound": [0, 0, 0, 0]} if type(bonds) == int else bonds
+        self.rgba = tuple(rgba)
+        self.bonds = bonds
+
+        # Initial bond state of a new atom: One free electron for each of the first directions
+        self.state = sum(1 << (2 * i) for i in range(bonds))
+
+    @classmethod
+    def get(cls, symbol: str, name: str, rgba: tuple[float, float, float, float] | list[float], bonds: int):
+        """
+        Gets the shared element object from the flyweight table. Creates and stores a new one, if the element isn't in
+        the table yet or if its data changed.
+        :param symbol: Chemical symbol.
+        :param name: Element name.
+        :param rgba: Color as RGBA (0.0..1.0, 0.0..1.0, 0.0..1.0, 0.0..1.0).
+        :param bonds: Number of bonds 1..4.
+        :return: Shared CElement.
+        """
+        element = cls.table.get(symbol)
+        if (element is None) or (element.name, element.rgba, element.bonds) != (name, tuple(rgba), bonds):
+            element = cls(symbol, name, rgba, bonds)
+            cls.table.update({symbol: element})
+        return element
+
+
+def unpack(byte):
+    """
+    Unpacks a byte with four 2 bit fields (one for each direction) to a list.
+    :param byte: Packed byte.
+    :return: List of 4 ints 0..3.
+    """
+    return [(byte >> (2 * direction)) & 3 for direction in range(4)]
+
+
+def pack(values):
+    """
+    Packs a list of four values 0..3 (one for each direction) to a byte.
+    :param values: List of 4 ints 0..3.
+    :return: Packed byte.
+    """
+    return sum(value << (2 * direction) for direction, value in enumerate(values))
+
+
+def create_delocalize_table():
+    """
+    Creates the lookup table for electron delocalization. Free electrons rotate between the directions without bonds.
+    :return: Tuple of packed free electrons, indexed by unbound directions bitmask (4 bits) << 8 | packed free electrons.
+    """
+    table = []
+    for unbound in range(16):
+        destinations = [i for i in range(4) if unbound & (1 << i)]
+        for byte in range(256):
+            free = unpack(byte)
+            if len(destinations) > 0:
+                temp = free[destinations[0]]
+                for i in range(len(destinations) - 1):
+                    free[destinations[i]] = free[destinations[i + 1]]
+                free[destinations[-1]] = temp
+            table.append(pack(free))
+    return tuple(table)
+
+
+def create_bind_table():
+    """
+    Creates the lookup table for the removal of free electrons upon binding. Free electrons are removed clockwise
+    starting with the bond direction.
+    :return: Tuple of packed free electrons, indexed by (direction << 2 | number of bonds) << 8 | packed free electrons.
+    """
+    table = []
+    for direction in range(4):
+        for nr in range(4):
+            for byte in range(256):
+                free = unpack(byte)
+                b = nr
+                for d in [(direction + i) % 4 for i in range(4)]:
+                    if b > free[d]:
+                        b -= free[d]
+                        free[d] = 0
+                    else:
+                        free[d] -= b
+                        break
+                table.append(pack(free))
+    return tuple(table)
+
+
+MOVES = ((0, -1), (1, 0), (0, 1), (-1, 0))
+"""
+Positional change (dx, dy) for each direction 0..3.
+"""
+DIRECTIONS = {d_pos: direction for direction, d_pos in enumerate(MOVES)}
+"""
+Direction for each normalized positional change (dx, dy).
+"""
+OPPOSITE_DIRECTIONS = (2, 3, 0, 1)
+"""
+Opposite direction, indexed by direction 0..3.
+"""
+ROTATE = tuple(tuple(pack(unpack(byte)[-nr:] + unpack(byte)[:-nr]) if nr else byte for byte in range(256))
+               for nr in range(4))
+"""
+Packed byte after clockwise rotation, indexed by number of rotations and packed byte.
+"""
+H_FLIP = tuple(pack([unpack(byte)[i] for i in (0, 3, 2, 1)]) for byte in range(256))
+"""
+Packed byte after horizontal flip, indexed by packed byte.
+"""
+V_FLIP = tuple(pack([unpack(byte)[i] for i in (2, 1, 0, 3)]) for byte in range(256))
+"""
+Packed byte after vertical flip, indexed by packed byte.
+"""
+SUMS = tuple(sum(unpack(byte)) for byte in range(256))
+"""
+Sum of all 4 fields, indexed by packed byte.
+"""
+COUNTS = tuple(tuple(unpack(byte).count(value) for value in range(4)) for byte in range(256))
+"""
+Number of fields with the value 0..3, indexed by packed byte.
+"""
+ZERO_MASKS = tuple(sum(1 << i for i, value in enumerate(unpack(byte)) if value == 0) for byte in range(256))
+"""
+Bitmask of the fields (directions) with the value 0, indexed by packed byte.
+"""
+DELOCALIZE = create_delocalize_table()
+"""
+Packed free electrons after delocalization, indexed by unbound directions bitmask << 8 | packed free electrons.
+"""
+BIND = create_bind_table()
+"""
+Packed free electrons after binding, indexed by (direction << 2 | number of bonds) << 8 | packed free electrons.
+"""
+
+
+class CAtom:
+    """
+    A single atom. The atom refers to its (shared) CElement and stores its bond state packed into a single int: Two
+    bits per direction for the number of free electrons (bits 0..7) and for the number of bound electrons (bits 8..15).
+    All bond state transitions are table lookups.
+    """
+    __slots__ = ("element", "state")
+
+    FREE_SHIFT = 0
+    BOUND_SHIFT = 8
+
+    def __init__(self, element: CElement, state: int | None = None):
+        """
+        Creates an atom object.
+        :param element: Shared CElement.
+        :param state: Optional, packed bond state. Default is the initial state of the element.
+        """
+        self.element = element
+        self.state = element.state if state is None else state
 
     @classmethod
     def from_dict(cls, d):
@@ -20,7 +178,20 @@ class CAtom:
         :param d: Dict with parameters symbol, name, color (either RGB or RGBA), and bonds.
         :return: Created CAtom.
         """
-        return cls(d["symbol"], d["name"], d["color"] if len(d["color"]) == 4 else d["color"] + [1.0], d["bonds"])
+        return cls(CElement.get(d["symbol"], d["name"], d["color"] if len(d["color"]) == 4 else d["color"] + [1.0],
+                                d["bonds"]))
+
+    @property
+    def symbol(self):
+        return self.element.symbol
+
+    @property
+    def name(self):
+        return self.element.name
+
+    @property
+    def rgba(self):
+        return self.element.rgba
 
     @staticmethod
     def move(direction):
@@ -29,19 +200,16 @@ class CAtom:
         :param direction: Direction as int 0..3.
         :return: Change in position as tuple (dx, dy).
         """
-        dx = (direction % 2) * (1 + (direction // 2) * -2)
-        dy = ((direction + 1) % 2) * (-1 + (direction // 2) * 2)
-        return dx, dy
+        return MOVES[direction]
 
     @staticmethod
     def direction(d_pos):
         """
         Converts a normalized positional change in a direction.
         :param d_pos: Change in position as tuple (dx, dy).
-        :return: Change in position as tuple (dx, dy).
+        :return: Direction as int 0..3.
         """
-        dx, dy = d_pos
-        return ((dy + 2) // 2) * 2 - dx
+        return DIRECTIONS[d_pos]
 
     @staticmethod
     def opposite_direction(direction):
@@ -50,37 +218,113 @@ class CAtom:
         :param direction: Direction as int 0..3.
         :return: Opposite direction as int 0..3.
         """
-        return (direction + 2) % 4
+        return OPPOSITE_DIRECTIONS[direction]
 
-    def delocalize_free(self):
+    def get_free(self, direction):
         """
-        Moves all free bonds of an atom. This simulates electron delocalization.
+        Gets the number of free electrons for a direction.
+        :param direction: Direction as int 0..3.
+        :return: Number of free electrons 0..3.
         """
+        return (self.state >> (self.FREE_SHIFT + 2 * direction)) & 3
 
-        # Either random swap
-        # destinations = [i for i in range(4) if (self.bonds["bound"][i] == 0) and (self.bonds["free"][i] == 0)]
-        # sources = [i for i in range(4) if self.bonds["free"][i] != 0]
-        # if (len(sources) >= 1) and (len(destinations) >= 1):
-        #     s = random.choice(sources)
-        #     d = random.choice(destinations)
-        #     temp = self.bonds["free"][d]
-        #     self.bonds["free"][d] = self.bonds["free"][s]
-        #     self.bonds["free"][s] = temp
+    def get_bound(self, direction):
+        """
+        Gets the number of bound electrons (= bonds) for a direction.
+        :param direction: Direction as int 0..3.
+        :return: Number of bonds 0..3.
+        """
+        return (self.state >> (self.BOUND_SHIFT + 2 * direction)) & 3
 
-        # Or rotation
-        destinations = [i for i in range(4) if self.bonds["bound"][i] == 0]
-        if len(destinations) > 0:
-            temp = self.bonds["free"][destinations[0]]
-            for i in range(len(destinations) - 1):
-                self.bonds["free"][destinations[i]] = self.bonds["free"][destinations[i + 1]]
-            self.bonds["free"][destinations[-1]] = temp
+    def set_free(self, direction, nr):
+        """
+        Sets the number of free electrons for a direction.
+        :param direction: Direction as int 0..3.
+        :param nr: Number of free electrons 0..3.
+        """
+        shift = self.FREE_SHIFT + 2 * direction
+        self.state = (self.state & ~(3 << shift)) | (nr << shift)
+
+    def set_bound(self, direction, nr):
+        """
+        Sets the number of bound electrons (= bonds) for a direction.
+        :param direction: Direction as int 0..3.
+        :param nr: Number of bonds 0..3.
+        """
+        shift = self.BOUND_SHIFT + 2 * direction
+        self.state = (self.state & ~(3 << shift)) | (nr << shift)
+
+    def count_free(self):
+        """
+        Counts the number of free electrons in all directions.
+        :return: Number of free electrons.
+        """
+        return SUMS[self.state & 0xFF]
+
+    def count_bound(self, bond=None):
+        """
+        Counts bonds in all directions.
+        :param bond: Optional, bond type 1..3. If provided, only the directions with this bond type are counted.
+        Otherwise, the total number of bonds is returned.
+        :return: Number of bonds.
+        """
+        if bond is None:
+            return SUMS[self.state >> 8]
+        return COUNTS[self.state >> 8][bond]
+
+    def bind(self, direction, nr):
+        """
+        Sets the bonds for a direction and removes the same number of free electrons clockwise starting with this
+        direction.
+        :param direction: Direction as int 0..3.
+        :param nr: Number of bonds 0..3.
+        """
+        shift = 2 * direction
+        bound = ((self.state >> 8) & ~(3 << shift)) | (nr << shift)
+        self.state = BIND[(((direction << 2) | nr) << 8) | (self.state & 0xFF)] | (bound << 8)
+
+    def unbind(self, direction):
+        """
+        Changes the bonds for a direction from "bound" to "free".
+        :param direction: Direction as int 0..3.
+        """
+        shift = 2 * direction
+        bound = (self.state >> (8 + shift)) & 3
+        self.state += (bound << shift) - (bound << (8 + shift))
+
+    def rotate(self, nr=1):
+        """
+        Clockwise rotation of the bonds (bound and free).
+        :param nr: number of rotations.
+        """
+        table = ROTATE[nr % 4]
+        self.state = table[self.state & 0xFF] | (table[self.state >> 8] << 8)
+
+    def h_flip(self):
+        """
+        Flips the bonds (bound and free) horizontally.
+        """
+        self.state = H_FLIP[self.state & 0xFF] | (H_FLIP[self.state >> 8] << 8)
+
+    def v_flip(self):
+        """
+        Flips the bonds (bound and free) vertically.
+        """
+        self.state = V_FLIP[self.state & 0xFF] | (V_FLIP[self.state >> 8] << 8)
+
+    def delocalize_free(self):
+        """
+        Moves all free bonds of an atom. This simulates electron delocalization by rotation of the free electrons
+        between all directions without bonds.
+        """
+        self.state = DELOCALIZE[(ZERO_MASKS[self.state >> 8] << 8) | (self.state & 0xFF)] | (self.state & 0xFF00)
 
     def count_connected(self):
         """
         Counts the number of connected other atoms (NOT bonds).
         :return: Number of connected other atoms.
         """
-        return sum(1 for bond in self.bonds["bound"] if bond)
+        return 4 - COUNTS[self.state >> 8][0]
 
     def equals(self, other):
         """
@@ -89,11 +333,7 @@ class CAtom:
         :param other: Other CAtom.
         :return: True or False.
         """
-        return (self.symbol == other.symbol) and \
-               (self.bonds["bound"].count(1) == other.bonds["bound"].count(1)) and \
-               (self.bonds["bound"].count(2) == other.bonds["bound"].count(2)) and \
-               (self.bonds["bound"].count(3) == other.bonds["bound"].count(3))
-
+        return (self.element.symbol == other.element.symbol) and (COUNTS[self.state >> 8] == COUNTS[other.state >> 8])
 
     def copy(self):
         """
@@ -103,13 +343,7 @@ class CAtom:
         return self.__copy__()
 
     def __copy__(self):
-        n_atom = CAtom(self.symbol,
-                       self.name,
-                       self.rgba.copy(),
-                       {"free": self.bonds["free"].copy(),
-                        "bound": self.bonds["bound"].copy()})
-        return n_atom
+        return CAtom(self.element, self.state)
 
     def __str__(self):
-        return self.symbol
-
+        return self.element.symbol
@@ -0,0 +1,108 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from catom import CElement, DELOCALIZE, ZERO_MASKS
+from cmolecule import CMolecule
+
+
+class CAtomTable:
+    """
+    CAtomTable stores all atoms of a set of molecules (e.g., of all molecules in a reactor) as parallel numpy arrays
+    (struct of arrays) for batch operations over all atoms in one call. The molecules remain the owners of their atoms:
+    Changes by batch operations are written back to the molecules. Requires numpy, see CAtomTable.available().
+    """
+
+    if numpy is not None:
+        DELOCALIZE = numpy.array(DELOCALIZE, dtype=numpy.uint8)
+        ZERO_MASKS = numpy.array(ZERO_MASKS, dtype=numpy.intp)
+
+    def __init__(self, placements: list[tuple[CMolecule, int, int]] | None = None):
+        """
+        Creates an atom table.
+        :param placements: Optional, list of molecules with their positions as tuples (molecule, col, row).
+        """
+        self.molecules: list[CMolecule] = []
+        self.elements: list[CElement] = []
+        self.x = None
+        self.y = None
+        self.element = None
+        self.free = None
+        self.bound = None
+        self.owner = None
+        self.cell = None
+        self.set_molecules(placements if placements else [])
+
+    @staticmethod
+    def available():
+        """
+        Checks if numpy is available.
+        :return: True, if atom tables can be used. Otherwise, False.
+        """
+        return numpy is not None
+
+    def set_molecules(self, placements: list[tuple[CMolecule, int, int]]):
+        """
+        (Re-)Builds the table from a list of molecules.
+        :param placements: List of molecules with their positions as tuples (molecule, col, row).
+        """
+
+        # Step 1: Collect the atoms of all molecules in data order
+        self.molecules = [molecule for molecule, __, __ in placements]
+        element_ids = {}
+        x, y, element, free, bound, owner, cell = [], [], [], [], [], [], []
+        for nr, (molecule, col, row) in enumerate(placements):
+            w = molecule.dim[0]
+            for i, atom in enumerate(molecule.data):
+                if atom:
+                    x.append(col + i % w)
+                    y.append(row + i // w)
+                    element.append(element_ids.setdefault(atom.element, len(element_ids)))
+                    free.append(atom.state & 0xFF)
+                    bound.append(atom.state >> 8)
+                    owner.append(nr)
+                    cell.append(i)
+        self.elements = list(element_ids)
+
+        # Step 2: Create arrays
+        self.x = numpy.array(x, dtype=numpy.intp)
+        self.y = numpy.array(y, dtype=numpy.intp)
+        self.element = numpy.array(element, dtype=numpy.intp)
+        self.free = numpy.array(free, dtype=numpy.uint8)
+        self.bound = numpy.array(bound, dtype=numpy.uint8)
+        self.owner = numpy.array(owner, dtype=numpy.intp)
+        self.cell = numpy.array(cell, dtype=numpy.intp)
+
+    def get_free(self, direction):
+        """
+        Gets the number of free electrons of all atoms for a direction.
+        :param direction: Direction as int 0..3.
+        :return: Array of the number of free electrons 0..3.
+        """
+        return (self.free >> (2 * direction)) & 3
+
+    def get_bound(self, direction):
+        """
+        Gets the number of bound electrons (= bonds) of all atoms for a direction.
+        :param direction: Direction as int 0..3.
+        :return: Array of the number of bonds 0..3.
+        """
+        return (self.bound >> (2 * direction)) & 3
+
+    def delocalize_free_bonds(self):
+        """
+        Moves all free bonds for the respective atom for all atoms of all molecules and writes the result back to the
+        molecules. This simulates electron delocalization. Only the changed atoms are written back, in one call per
+        molecule.
+        """
+        free = self.DELOCALIZE[(self.ZERO_MASKS[self.bound] << 8) | self.free]
+        changed = numpy.flatnonzero(free != self.free)
+        self.free = free
+
+        states = ((self.bound[changed].astype(numpy.intp) << 8) | free[changed]).tolist()
+        cells = self.cell[changed].tolist()
+        bounds = numpy.searchsorted(self.owner[changed], numpy.arange(len(self.molecules) + 1)).tolist()
+        for nr, molecule in enumerate(self.molecules):
+            start, end = bounds[nr], bounds[nr + 1]
+            molecule.delocalize_free_bonds(dict(zip(cells[start:end], states[start:end])))
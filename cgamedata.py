@@ -0,0 +1,47 @@
+from json import load as load_json
+from os.path import join, dirname
+
+from catom import CAtom
+from cmolecule import CMolecule
+
+DATA_PATH = join(dirname(__file__), "data")
+
+
+def load_atoms(filename):
+    """
+    Loads atom data from a json file (e.g., <DATA_PATH>/atoms.json).
+    :param filename: (Path and) Filename of the json file.
+    :return: Dict of CAtom by symbol.
+    """
+    with open(filename, "r", encoding="utf8") as read_file:
+        return {a["symbol"]: CAtom.from_dict(a) for a in load_json(read_file)}
+
+
+def load_molecules(filename, atoms):
+    """
+    Loads molecule data (e.g., fragments or bonus molecules) from a json file and precomputes all orientations of each
+    molecule.
+    :param filename: (Path and) Filename of the json file.
+    :param atoms: Dict of CAtom by symbol.
+    :return: List of molecule data dicts, each with the CMolecule added as "molecule".
+    """
+    molecules = []
+    with open(filename, "r", encoding="utf8") as read_file:
+        for m in load_json(read_file):
+            m.update({"molecule": CMolecule(name=m["name"], atoms=atoms, txt=m["data"])})
+            m["molecule"].create_orientations()
+            molecules.append(m)
+    return molecules
+
+
+def load_game_data(data_path=DATA_PATH, fragments_filename="fragments.json", bonus_filename="bonus.json"):
+    """
+    Loads all game data needed by CGameEngine without Kivy.
+    :param data_path: Path to atoms.json and the molecule files.
+    :param fragments_filename: Filename of the fragment molecules in data_path.
+    :param bonus_filename: Filename of the bonus molecules in data_path.
+    :return: Tuple (fragments, bonus molecules), see CGameEngine.
+    """
+    atoms = load_atoms(join(data_path, "atoms.json"))
+    return (load_molecules(join(data_path, fragments_filename), atoms),
+            load_molecules(join(data_path, bonus_filename), atoms))
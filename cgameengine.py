@@ -0,0 +1,687 @@
+import random
+
+from cgravity import CBody, CGravity
+from cmolecule import CMolecule
+from cplacementtable import CPlacementTable
+from csupportgraph import CSupportGraph
+from ctools import fib
+
+
+class CPiece:
+    """
+    A molecule placed in the game: Either act or a molecule stored in the reactor.
+    """
+    __slots__ = ("molecule", "col", "row", "value", "rgba", "job", "count")
+
+    def __init__(self,
+                 molecule: CMolecule | None = None,
+                 col: int = 0,
+                 row: int = 0,
+                 value: int = 0,
+                 rgba: tuple[float, float, float, float] = (0, 0, 0, 0),
+                 job: str = "",
+                 count: int = 0):
+        self.molecule = molecule if molecule is not None else CMolecule()
+        self.col = col
+        self.row = row
+        self.value = value
+        self.rgba = rgba
+        self.job = job
+        self.count = count
+
+
+class CGameEngine:
+    """
+    Kivy-free game state and rules: Spawn, drop, store, merge, destroy, gravity, level speed, and bonus scheduling. The
+    game proceeds by calling step() once per timer tick. Each step returns a list of events (dicts with a "type" key) to
+    be rendered:
+    sfx (name, optional size), stop_sfx (name), add / remove / move / set (piece), spawn (name), delocalize, explode
+    (molecule, value, bonus), level (level), and game_over.
+    """
+
+    COLS = 8
+    ROWS = 16
+    MAX_COLS = 64
+    MAX_ROWS = 128
+    DESTROY_COUNT = 16
+    DELOCALIZE_INTERVAL = 40
+    COMMANDS = ("left", "right", "flip", "rotate", "drop", "hard_drop", "grab", "release")
+
+    def __init__(self,
+                 fragments: list[dict],
+                 bonus_molecules: list[dict],
+                 cols: int = COLS,
+                 rows: int = ROWS,
+                 nr_molecules: int = 0,
+                 fragment_names: list[str] | None = None,
+                 bonus_names: list[str] | None = None,
+                 seed: int | None = None):
+        """
+        Creates a new game. Games with the same settings (see settings) and the same commands for each step are equal.
+        :param fragments: List of fragment dicts with name, value, and molecule (with precomputed orientations).
+        :param bonus_molecules: List of bonus molecule dicts with name, value, and molecule (with precomputed
+        orientations).
+        :param cols: Number of reactor columns 1..MAX_COLS.
+        :param rows: Number of reactor rows 1..MAX_ROWS.
+        :param nr_molecules: Number of molecules at start (to set the level number).
+        :param fragment_names: Optional, names of the only fragments to spawn (in this order) for testing.
+        :param bonus_names: Optional, names of the only bonus molecules to create (in this order) for testing.
+        :param seed: Optional, seed for the random generators of this game. Default: Random seed.
+        :raises ValueError: If the reactor dimension is invalid.
+        """
+        if not ((1 <= cols <= self.MAX_COLS) and (1 <= rows <= self.MAX_ROWS)):
+            raise ValueError("Invalid reactor dimension " + str(cols) + "x" + str(rows) + ".")
+
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.settings = {"cols": cols, "rows": rows, "nr_molecules": nr_molecules,
+                         "fragment_names": list(fragment_names) if fragment_names else [],
+                         "bonus_names": list(bonus_names) if bonus_names else [], "seed": seed}
+        """
+        Settings to create an equal game.
+        """
+        self.seed = seed
+        self.random = random.Random(seed)
+        """
+        Random generator for the game rules. All randomness of the game must be taken from here.
+        """
+        self.effects_random = random.Random(self.random.getrandbits(64))
+        """
+        Random generator for (visual or audio) effects only, so that rendering doesn't change the game. Seeded once from
+        the game random generator, so that both don't produce the same sequence.
+        """
+        self.fragments = fragments
+        self.bonus_molecules = bonus_molecules
+        self._fragments_by_name = {f["name"]: f for f in fragments}
+        self._bonus_molecules_by_name = {b["name"]: b for b in bonus_molecules}
+        self.cols = cols
+        self.rows = rows
+        self.fragment_names = list(fragment_names) if fragment_names else []
+        self.bonus_names = list(bonus_names) if bonus_names else []
+
+        self.support = CSupportGraph(cols, rows)
+        self.pieces: list[CPiece] = []
+        """
+        Pieces stored in the reactor, the latest first.
+        """
+        self.act = CPiece()
+        self.bonus = CPiece()
+        self.bonus_name = ""
+        self.fragment_name = ""
+        self.score = 0
+        self.time = 0
+        self.nr_molecules = nr_molecules
+        self.over = False
+        self.events: list[dict] = []
+
+        self._bonus_queue: list[dict] = []
+        self._cleanup = None
+        self._placements = None
+
+        self.reset_act()
+
+    def is_stable(self):
+        """
+        Tests if the complete game state can be taken, i.e., if no cleanup round is in progress. See get_state().
+        :return: True, if stable. Otherwise, False.
+        """
+        return self._cleanup is None
+
+    def encode_molecule(self, molecule: CMolecule):
+        """
+        Encodes a molecule of the game in a compact json-serializable form: A reference to the fragment orientation
+        (name, orientation index, phase) if the molecule is an unchanged fragment orientation. Otherwise, the molecule
+        line (see CMolecule.to_line()).
+        :param molecule: CMolecule.
+        :return: List or str.
+        """
+        fragment = self._fragments_by_name.get(molecule.name)
+        if (fragment is not None) and molecule.shares_orientations(fragment["molecule"]):
+            return [molecule.name, molecule.get_orientation_index(), molecule.get_orientation_phase()]
+        return molecule.to_line()
+
+    def decode_molecule(self, code):
+        """
+        Decodes a molecule, see encode_molecule().
+        :param code: List or str.
+        :return: CMolecule.
+        :raises ValueError: If the code refers to unknown fragments or atoms.
+        """
+        if isinstance(code, list):
+            name, orientation, phase = code
+            if name not in self._fragments_by_name:
+                raise ValueError("Unknown fragment " + str(name) + ".")
+            return self._fragments_by_name[name]["molecule"].get_orientation(orientation, phase)
+
+        atoms = {atom.element.symbol: atom for f in self.fragments for atom in f["molecule"].data if atom}
+        return CMolecule.from_line(atoms, code)
+
+    def get_state(self):
+        """
+        Gets the complete game state (without settings) in a compact json-serializable form, including the states of the
+        random generators. See set_state().
+        :return: Dict.
+        :raises ValueError: If a cleanup round is in progress, see is_stable().
+        """
+        if not self.is_stable():
+            raise ValueError("No stable game state during cleanup.")
+
+        act = self.act
+        return {"time": self.time,
+                "score": self.score,
+                "nr_molecules": self.nr_molecules,
+                "over": self.over,
+                "act": [self.encode_molecule(act.molecule), act.col, act.row, act.value, list(act.rgba), act.job,
+                        act.count],
+                "pieces": [[self.encode_molecule(piece.molecule), piece.col, piece.row, piece.value, list(piece.rgba)]
+                           for piece in self.pieces],
+                "bonus": [self.bonus_name, self.bonus.value] if self.bonus.molecule else None,
+                "bonus_name": self.bonus_name,
+                "fragment_name": self.fragment_name,
+                "fragment_names": self.fragment_names,
+                "bonus_names": self.bonus_names,
+                "bonus_queue": [b["name"] for b in self._bonus_queue],
+                "random": self.random.getstate(),
+                "effects_random": self.effects_random.getstate()}
+
+    def set_state(self, state: dict):
+        """
+        Restores a complete game state, see get_state(). The engine must have been created with the same settings.
+        :param state: Dict.
+        """
+        molecule, col, row, value, rgba, job, count = state["act"]
+        self.act = CPiece(self.decode_molecule(molecule), col, row, value, tuple(rgba), job, count)
+
+        self.pieces = [CPiece(self.decode_molecule(molecule), col, row, value, tuple(rgba))
+                       for molecule, col, row, value, rgba in state["pieces"]]
+        self.support = CSupportGraph(self.cols, self.rows)
+        for piece in reversed(self.pieces):
+            self.support.add(piece, piece.molecule, piece.col, piece.row)
+
+        self.bonus_name = state["bonus_name"]
+        self.bonus = CPiece()
+        if state["bonus"] is not None:
+            name, value = state["bonus"]
+            self.bonus = CPiece(self._bonus_molecules_by_name[name]["molecule"].get_orientation(0), value=value)
+
+        self.time = state["time"]
+        self.score = state["score"]
+        self.nr_molecules = state["nr_molecules"]
+        self.over = state["over"]
+        self.fragment_name = state["fragment_name"]
+        self.fragment_names = list(state["fragment_names"])
+        self.bonus_names = list(state["bonus_names"])
+        self._bonus_queue = [self._bonus_molecules_by_name[name] for name in state["bonus_queue"]]
+        for generator, key in ((self.random, "random"), (self.effects_random, "effects_random")):
+            version, internal, gauss = state[key]
+            generator.setstate((version, tuple(internal), gauss))
+
+        self.events = []
+        self._cleanup = None
+        self._placements = None
+
+    def emit(self, event_type: str, **kwargs):
+        """
+        Adds an event to the events of the current step.
+        :param event_type: Event type.
+        :param kwargs: Event data.
+        """
+        self.events.append(dict(type=event_type, **kwargs))
+
+    def add_piece(self, piece: CPiece):
+        """
+        Stores a piece in the reactor.
+        :param piece: CPiece.
+        """
+        self.pieces.insert(0, piece)
+        self.support.add(piece, piece.molecule, piece.col, piece.row)
+        self.emit("add", piece=piece)
+
+    def remove_piece(self, piece: CPiece):
+        """
+        Removes a piece from the reactor.
+        :param piece: CPiece.
+        """
+        self.pieces.remove(piece)
+        self.support.remove(piece)
+        self.emit("remove", piece=piece)
+
+    def set_piece_molecule(self, piece: CPiece, molecule: CMolecule, col: int, row: int):
+        """
+        Replaces the molecule of a piece in the reactor and moves the piece.
+        :param piece: CPiece.
+        :param molecule: New CMolecule.
+        :param col: New X position in blocks.
+        :param row: New Y position in blocks.
+        """
+        self.support.remove(piece)
+        piece.molecule = molecule
+        piece.col = col
+        piece.row = row
+        self.support.add(piece, molecule, col, row)
+        self.emit("set", piece=piece)
+
+    def fits(self, molecule: CMolecule, col: int, row: int):
+        """
+        Tests if molecule fits into the reactor (without collision detection).
+        :param molecule: CMolecule to test.
+        :param col: X position of molecule in blocks.
+        :param row: Y position of molecule in blocks.
+        :return: True, if molecule fits, otherwise False.
+        """
+        return (col >= 0) and (row >= 0) and (col + molecule.dim[0] <= self.cols) and (row + molecule.dim[1] <= self.rows)
+
+    def get_landing_row(self):
+        """
+        Gets the row where act comes to rest if dropped straight down.
+        :return: Landing row.
+        """
+        return self.support.get_landing_row(self.act.molecule, self.act.col, self.act.row)
+
+    def reset_act(self):
+        """
+        Initializes act with en empty molecule.
+        """
+        self.act = CPiece(col=self.cols // 2, row=self.rows - 1)
+
+    def update_placements(self):
+        """
+        Updates the table of legal placements (column, orientation) for act at its current row, if outdated.
+        :return: CPlacementTable or None, if act has no precomputed orientations.
+        """
+        act = self.act
+        if act.molecule.get_orientation_index() is None:
+            self._placements = None
+        elif (self._placements is None) or (not self._placements.is_valid(act.molecule, act.row)):
+            self._placements = CPlacementTable(self.support, act.molecule, act.row)
+        return self._placements
+
+    def spawn_act(self):
+        """
+        Spawns a new molecule as act on top of the reactor.
+        :return: True, if success. Otherwise, False.
+        """
+
+        # Step 1: Test mode:
+        if self.fragment_names:
+            choice = next(fragment for fragment in self.fragments if fragment["name"] == self.fragment_names[0])
+            self.fragment_names = self.fragment_names[1:] + self.fragment_names[:1]
+
+        # Or step 1: Play mode
+        else:
+            # Step 1: Find all fragments with value <= level + 1
+            candidates = [f for f in self.fragments if f["value"] <= self.nr_molecules // 10 + 2]
+
+            # Step 2: New molecule from random selection
+            choice = self.random.choice(candidates)
+
+        # Step 3: Random rotation, flip from precomputed orientations
+        rotations = self.random.randint(0, 3)
+        flip = self.random.randint(0, 1)
+        molecule = choice["molecule"].get_orientation(4 * flip + rotations)
+
+        # Step 4: Apply to act
+        self.act = CPiece(molecule, (self.cols - molecule.dim[0]) // 2, self.rows - molecule.dim[1],
+                          value=fib(choice["value"]), job="play")
+        self.fragment_name = choice["name"]
+
+        # Step 5: Stop if no space. Otherwise, tabulate the legal moves.
+        if self.support.test_collision(molecule, self.act.col, self.act.row):
+            return False
+        self.update_placements()
+        self.emit("spawn", name=choice["name"])
+        return True
+
+    def create_bonus(self):
+        """
+        Creates a new bonus molecule.
+        """
+
+        # Step 1 in test mode:
+        if self.bonus_names:
+            choice = next(b for b in self.bonus_molecules if b["name"] == self.bonus_names[0])
+            self.bonus_names = self.bonus_names[1:] + self.bonus_names[:1]
+
+        # Or step 1 in play mode: Check if bonus molecules with value <= level + 1 already in the queue
+        # Random insert, but not on last pos
+        else:
+            for bonus_molecule in self.bonus_molecules:
+                if (bonus_molecule not in self._bonus_queue) and (bonus_molecule["value"] <= 2 + self.nr_molecules // 10):
+                    if len(self._bonus_queue) > 1:
+                        l = self._bonus_queue[:-1]
+                        l.insert(self.random.randrange(start=0, stop=len(l)), bonus_molecule)
+                        self._bonus_queue = l + [self._bonus_queue[-1]]
+                    else:
+                        self._bonus_queue.insert(0, bonus_molecule)
+
+            # Step 2: Get the first bonus molecule and put it back to the end of the list
+            choice = self._bonus_queue[0]
+            self._bonus_queue = self._bonus_queue[1:] + self._bonus_queue[:1]
+
+        # Step 3: New bonus molecule
+        self.bonus_name = choice["name"]
+        self.bonus = CPiece(choice["molecule"].get_orientation(0), value=fib(choice["value"] + 1) * 100)
+
+    def destroy_act(self):
+        """
+        Proceeds countdown and finally destroys act.
+        """
+        act = self.act
+        act.count -= 1
+
+        # Just before explosion
+        if act.count == 0:
+            self.emit("sfx", name="explode", size=act.molecule.dim[0] * act.molecule.dim[1])
+
+        # At explosion: Add score and get bonus
+        elif act.count < 0:
+            value = act.value * 10
+            self.nr_molecules += 1
+            self.score += value
+
+            bonus = 0
+            if act.molecule.equals(self.bonus.molecule):
+                bonus = self.bonus.value
+                self.score += bonus
+                self.bonus = CPiece()
+            self.emit("explode", molecule=act.molecule, value=value, bonus=bonus)
+
+            # Next level?
+            if self.nr_molecules % 10 == 0:
+                self.emit("level", level=self.nr_molecules // 10 + 1)
+
+            self.reset_act()
+
+    def merge_to_act(self, candidates: list[CPiece] | None = None):
+        """
+        Merges act with the first mergeable piece from the reactor, takes over its color, adds its value, removes it
+        from reactor.
+        :param candidates: Optional, pieces bordering act in the order of the reactor pieces. Only these are tried. The
+        list is updated upon merge. Default: Determined from reactor.
+        :return: True, if merged. Otherwise, False.
+        """
+        act = self.act
+
+        if candidates is None:
+            candidates = sorted(self.support.list_neighbors(act.molecule, act.col, act.row), key=self.pieces.index)
+
+        for piece in candidates:
+            molecule = act.molecule.copy()
+            if molecule.connect(piece.molecule, (piece.col - act.col, piece.row - act.row)):
+                act.molecule = molecule
+                act.col = min(piece.col, act.col)
+                act.row = min(piece.row, act.row)
+                act.rgba = piece.rgba
+                act.value += piece.value
+
+                # The merged atoms add their neighbors to the candidates
+                candidates.remove(piece)
+                candidates.extend(neighbor for neighbor in self.support.list_neighbors(piece.molecule, piece.col, piece.row)
+                                  if neighbor not in candidates)
+                candidates.sort(key=self.pieces.index)
+                self.remove_piece(piece)
+                return True
+
+        return False
+
+    def store_act(self):
+        """
+        Merges (if possible) or adds act to reactor.
+        """
+        act = self.act
+
+        # Play boom sound
+        self.emit("stop_sfx", name="drop")
+        if ((act.job == "drop") and (act.count > 0)) or (act.job in ["play", "move"]):
+            self.emit("sfx", name="boom")
+
+        # Add score
+        if act.job == "drop":
+            self.score += act.count
+
+        # Check and merge with the neighbors of act
+        candidates = sorted(self.support.list_neighbors(act.molecule, act.col, act.row), key=self.pieces.index)
+        while self.merge_to_act(candidates):
+            pass
+
+        # Random color, if not set yet
+        if act.rgba == (0, 0, 0, 0):
+            act.rgba = (self.random.randint(0, 3) / 3, self.random.randint(0, 3) / 3, self.random.randint(0, 3) / 3, 0.25)
+
+        # Destroy act, if complete
+        if not act.molecule.has_free_bonds():
+            act.job = "destroy"
+            act.count = self.DESTROY_COUNT
+            self.emit("sfx", name="bonus" if act.molecule.equals(self.bonus.molecule) else "success")
+
+        # Otherwise, transfer to reactor
+        else:
+            self.add_piece(CPiece(act.molecule, act.col, act.row, act.value, act.rgba))
+            self.reset_act()
+
+    def drop_act(self):
+        """
+        Tries to drop act by 1 step. If this is not possible, then act is stored into reactor.
+        :return: True if successful move 1 step down. Otherwise, False.
+        """
+        act = self.act
+
+        # Above the landing row: move
+        if act.row > self.get_landing_row():
+            act.row -= 1
+            if act.job == "drop":
+                act.count += 1
+            else:
+                self.update_placements()
+            return True
+
+        # Otherwise, just store
+        else:
+            self.store_act()
+            return False
+
+    def hard_drop_act(self):
+        """
+        Drops act straight to its landing row and stores it into reactor in a single step.
+        """
+        act = self.act
+        row = self.get_landing_row()
+        act.job = "drop"
+        act.count = act.row - row
+        act.row = row
+        self.store_act()
+
+    def drop_pieces(self):
+        """
+        Cleanup round for the reactor pieces: Solves where all floating pieces come to rest and which merges this causes
+        (see CGravity). Then drops the pieces by 1 block per call until they reached their resting positions, and
+        applies the merges afterward. A merged molecule without free bonds is transferred to act and stored (and thus
+        destroyed).
+        :return: True, if at least one piece dropped or merged. Otherwise, False.
+        """
+
+        # Only run if act empty
+        if self.act.molecule:
+            return False
+
+        # Step 1: Solve the next cleanup round. Nothing to do if no piece is floating.
+        if self._cleanup is None:
+            if not self.support.has_floating():
+                return False
+            bodies = [CBody(piece.molecule, piece.col, piece.row, owner=piece) for piece in self.pieces]
+            self._cleanup = CGravity(self.cols, self.rows).step(bodies)
+            if self._cleanup is None:
+                return False
+
+        # Step 2: Drop by 1 step until the resting positions are reached. Drop all at once to never overlap.
+        dropping = [body.owner for body, row in self._cleanup["rests"].items() if body.owner.row > row]
+        if dropping:
+            for piece in dropping:
+                self.support.remove(piece)
+            for piece in dropping:
+                piece.row -= 1
+                self.support.add(piece, piece.molecule, piece.col, piece.row)
+                self.score += 1
+                self.emit("move", piece=piece)
+            return True
+
+        # Step 3: Apply merges
+        result = self._cleanup
+        self._cleanup = None
+        if result["drops"]:
+            self.emit("sfx", name="boom")
+        for body, other in result["merges"]:
+            body.owner.value += other.owner.value
+            body.owner.rgba = other.owner.rgba
+            self.remove_piece(other.owner)
+        for body, __ in result["merges"]:
+            if body.owner in self.support.owners:
+                self.set_piece_molecule(body.owner, body.molecule, body.col, body.row)
+
+        # Step 4: Transfer a complete molecule to act and store (destroy) it
+        body = result["complete"]
+        if body is not None:
+            piece = body.owner
+            self.act = CPiece(piece.molecule, piece.col, piece.row, piece.value, piece.rgba, job="drop")
+            self.remove_piece(piece)
+            self.store_act()
+
+        return True
+
+    def h_move_act_to(self, col: int):
+        """
+        Moves act horizontally if it still fits into the reactor and doesn't collide with other molecules.
+        :param col: New col.
+        """
+        act = self.act
+        if act.col != col:
+            placements = self.update_placements()
+            if placements is not None:
+                legal = placements.is_legal(col, act.molecule.get_orientation_index())
+            else:
+                legal = self.fits(act.molecule, col, act.row) and not self.support.test_collision(act.molecule, col, act.row)
+
+            if legal:
+                act.col = col
+                self.emit("sfx", name="move")
+
+    def flip_act(self):
+        """
+        Flips act horizontally. No collision test needed.
+        """
+        self.act.molecule = self.act.molecule.get_h_flipped()
+        self.emit("sfx", name="flip")
+
+    def rotate_act(self):
+        """
+        Rotates act clockwise if it still fits into the reactor and doesn't collide with other molecules.
+        """
+        act = self.act
+
+        # Look up the rotated orientation before rotating
+        placements = self.update_placements()
+        if placements is not None:
+            if not placements.is_legal(act.col, act.molecule.get_rotated_orientation()):
+                return
+            molecule = act.molecule.get_rotated()
+        else:
+            molecule = act.molecule.get_rotated()
+            if not self.fits(molecule, act.col, act.row) or self.support.test_collision(molecule, act.col, act.row):
+                return
+
+        act.molecule = molecule
+        self.emit("sfx", name="flip")
+
+    def apply(self, command: str):
+        """
+        Applies a player command to act. Commands are ignored if act is not in play.
+        :param command: One of COMMANDS.
+        """
+        act = self.act
+
+        if command not in self.COMMANDS:
+            raise ValueError("Unknown command " + str(command) + ".")
+
+        # Grab and release act by touch
+        if command == "grab":
+            if act.job == "play":
+                act.job = "move"
+        elif command == "release":
+            if act.job == "move":
+                act.job = "play"
+
+        elif act.molecule and (act.job in ["play", "move"]):
+            if command == "left":
+                self.h_move_act_to(act.col - 1)
+            elif command == "right":
+                self.h_move_act_to(act.col + 1)
+            elif command == "flip":
+                self.flip_act()
+            elif command == "rotate":
+                self.rotate_act()
+            elif command == "drop":
+                act.job = "drop"
+                act.count = 1
+                self.emit("sfx", name="drop")
+            elif command == "hard_drop":
+                self.hard_drop_act()
+
+    def delocalize_free_bonds(self):
+        """
+        Moves all free bonds of act and of all reactor pieces for the respective atom. This simulates electron
+        delocalization.
+        """
+        if self.act.molecule:
+            self.act.molecule.delocalize_free_bonds()
+        for piece in self.pieces:
+            piece.molecule.delocalize_free_bonds()
+
+        self.emit("delocalize")
+
+    def step(self, inputs=()):
+        """
+        Proceeds the game by one timer tick.
+        :param inputs: Player commands (see COMMANDS) to apply before the tick.
+        :return: List of events of this step.
+        """
+        self.events = []
+        if self.over:
+            return self.events
+
+        for command in inputs:
+            self.apply(command)
+
+        self.time += 1
+        act = self.act
+
+        # Rotate free bonds every n cycles
+        if self.time % self.DELOCALIZE_INTERVAL == 0:
+            self.delocalize_free_bonds()
+
+        # Empty molecule: Cleanup reactor
+        # Try to drop all floating pieces. Otherwise, spawn a new molecule and check if to create a new bonus molecule.
+        if not act.molecule:
+            if not self.drop_pieces():
+                if not self.bonus.molecule:
+                    self.create_bonus()
+                if not self.spawn_act():
+                    self.over = True
+                    self.emit("game_over")
+
+        elif act.job == "destroy":
+            self.destroy_act()
+
+        elif act.job in ["play", "move"]:
+            act.count += 1
+
+            # Level-dependent number of cycles before drop to the next line
+            # Starting with 10 cycles for level 1 (0..9 nr_molecules) til 1 cycle, 20% less for each level compared to the
+            # previous one.
+            if act.count >= 1.0 + 19.0 * (0.8 ** (self.nr_molecules // 10)):
+                act.count = 0
+                self.drop_act()
+
+        elif act.job == "drop":
+            self.drop_act()
+
+        return self.events
@@ -1,5 +1,5 @@
-import random
 from math import sqrt
+from os.path import join
 
 from kivy.app import App
 from kivy.clock import Clock
@@ -10,29 +10,34 @@ from kivy.uix.relativelayout import RelativeLayout
 from kivy.uix.screenmanager import ScreenManager
 
 from cflyingtriangle import CFlyingTriangle
+from cgameengine import CGameEngine, CPiece
 from chover import CHover
 from cmolecule import CMolecule
 from cmoleculewidget import CMoleculeWidget
 from cnaviscreen import CNaviScreen
-from creactor import CReactor
-from ctools import fib, dict_get_or_create
+from creplay import CReplayWriter
+from ctools import dict_get_or_create
 from ctriangle import CTriangle
 
 
 class CGameScreen(CNaviScreen):
     """
-    CGameScreen is a Screen and also hosts the gameplay.
+    CGameScreen is a Screen and also hosts the gameplay. The game rules are implemented in CGameEngine. CGameScreen
+    forwards the player input to the engine, steps the engine on each timer tick, and renders its state and events.
     """
 
     PAUSE_KEY = "lctrl" # TODO Remove it until the first release.
     MENU_KEY = "escape"
-    DESTROY_COUNT = 16
+    HARD_DROP_KEY = "enter"
+    RECORDING_FILENAME = "last_game.replay"
 
+    engine: CGameEngine | None = None
+    recording: CReplayWriter | None = None
     _timer = None
-    _time = 0
-    _drop_from = 0
+    _inputs: list[str] = []
+    _widgets: dict[CPiece, CMoleculeWidget] = {}
+    _touch_opos = None
     _bg_filenames = ["bg0" + str(i) + ".jpg" for i in range(2, 7)]
-    _bonus_molecules = []
     _joystick_axes = {}
     _explosion_fragments: list[CFlyingTriangle] = []
 
@@ -45,15 +50,25 @@ class CGameScreen(CNaviScreen):
 
         if "reactor" in self.ids:
             self.ids.reactor.clear_widgets()
+            self.ids.reactor.set_dimension(app.reactor_cols, app.reactor_rows)
         else:
             pass
 
-        self.reset_act()
+        self.engine = CGameEngine(app.fragments, app.bonus_molecules, app.reactor_cols, app.reactor_rows,
+                                  nr_molecules=app.test_nr_molecules,
+                                  fragment_names=app.test_fragment_names,
+                                  bonus_names=app.test_bonus_names)
+
+        # Stream the recording of this game to <user_data_dir>. An unfinished previous recording is closed as is.
+        if self.recording is not None:
+            self.recording.close()
+        self.recording = CReplayWriter(join(app.user_data_dir, self.RECORDING_FILENAME), self.engine.settings)
+
+        self._inputs = []
+        self._widgets = {}
+        self._touch_opos = None
         self.set_theme()
-        self.score = 0
-        self._time = 0
-        self.nr_molecules = app.test_nr_molecules
-        self._drop_from = 0
+        self.update_widgets()
 
         self.ids.game_over_label.opacity = 0
 
@@ -65,6 +80,9 @@ class CGameScreen(CNaviScreen):
         game_over_label = self.ids.game_over_label
         game_over_label.opacity = 1
 
+        # Finish the recording of this game
+        self.recording.close(self.engine)
+
         # Remove continue button from main menu
         screen_manager: ScreenManager = App.get_running_app().root
         menu_screen = screen_manager.get_screen('menu_screen')
@@ -84,7 +102,7 @@ class CGameScreen(CNaviScreen):
         bonus = self.ids.bonus
 
         # Randomize but keep last list element to get sure to switch
-        random.shuffle(app.themes[:-1])
+        self.engine.effects_random.shuffle(app.themes[:-1])
 
         # Put this theme back to the end of the list
         theme = app.themes[0]
@@ -121,71 +139,150 @@ class CGameScreen(CNaviScreen):
         else:
             self.stop_timer()
 
-    def reset_act(self):
+    def update_widgets(self):
         """
-        Initializes act with en empty molecule.
+        Updates act, bonus, ghost, and the labels from the engine state.
         """
-
-        if (not "reactor" in self.ids) or (not "act" in self.ids):
-            return
-
-        reactor = self.ids.reactor
+        engine = self.engine
         act = self.ids.act
+        bonus = self.ids.bonus
 
-        act.col = reactor.COLS // 2
-        act.row = reactor.ROWS - 1
-        act.job = ""
-        act.params = {}
-        act.value = 0
-        act.rgba = (0, 0, 0, 0)
-        act.set_molecule(CMolecule())
+        self.score = engine.score
+        self.nr_molecules = engine.nr_molecules
+        self.ids.fragment_label.text = engine.fragment_name
 
-    def spawn_act(self):
-        """
-        Spawns a new molecule as act on top of the reactor.
-        :return: True, if success. Otherwise, False.
-        """
+        # Act: Only redraw if changed or blinking
+        piece = engine.act
+        act.move_to(piece.col, piece.row)
+        act.value = piece.value
+        if (act.molecule is not piece.molecule) or (act.rgba != piece.rgba) or (act.job != piece.job) or \
+                (piece.job == "destroy"):
+            act.molecule = piece.molecule
+            act.cols, act.rows = piece.molecule.dim
+            act.rgba = piece.rgba
+            act.set_job(piece.job, {"count": piece.count})
 
-        app = App.get_running_app()
-        reactor = self.ids.reactor
-        act = self.ids.act
+        # Bonus
+        if bonus.molecule is not engine.bonus.molecule:
+            bonus.name = engine.bonus_name
+            bonus.value = engine.bonus.value
+            bonus.set_molecule(engine.bonus.molecule)
 
-        # Step 1: Test mode:
-        if app.test_fragment_names:
-            choice = next(fragment for fragment in app.fragments if fragment["name"] == app.test_fragment_names[0])
-            app.test_fragment_names = app.test_fragment_names[1:] + app.test_fragment_names[:1]
+        self.update_ghost()
 
-        # Or step 1: Play mode
-        else:
-            # Step 1: Find all fragments with value <= level + 1
-            candidates = [f for f in app.fragments if f["value"] <= self.nr_molecules // 10 + 2]
+    def update_ghost(self):
+        """
+        Shows a preview (ghost) of act at its landing row while act is in play. Otherwise, hides the ghost.
+        """
 
-            # Step 2: New molecule from random selection
-            choice = random.choice(candidates)
+        if (not "act" in self.ids) or (not "ghost" in self.ids):
+            return
 
-        molecule = CMolecule(name=choice["name"])
-        molecule.parse(atoms=app.atoms, txt=choice["data"])
+        act = self.ids.act
+        ghost = self.ids.ghost
 
-        # Step 3: Random rotation, flip
-        molecule.rotate(random.randint(0, 3))
-        if random.randint(0, 1) == 1:
-            molecule.h_flip()
+        if act.molecule and (act.job in ["play", "move"]):
+            ghost.move_to(act.col, self.engine.get_landing_row())
+            if ghost.molecule is not act.molecule:
+                ghost.set_molecule(act.molecule)
+        elif ghost.molecule:
+            ghost.set_molecule(CMolecule())
 
-        # Step 4: Apply to act
-        act.col = (reactor.COLS - molecule.dim[0]) // 2
-        act.row = reactor.ROWS - molecule.dim[1]
-        act.job = "play"
-        act.params = {"count": 0}
-        act.value = fib(choice["value"])
-        act.rgba = (0, 0, 0, 0)
-        act.set_molecule(molecule)
+    def add_piece_widget(self, piece: CPiece):
+        """
+        Adds a new molecule widget for a piece stored in the reactor.
+        :param piece: CPiece.
+        """
+        reactor = self.ids.reactor
+        widget = CMoleculeWidget(name="", value=piece.value, col=piece.col, row=piece.row, dim=piece.molecule.dim,
+                                 rgba=piece.rgba, job="", params={"count": 0}, size_hint=(None, None))
+        widget.set_molecule(piece.molecule)
+        reactor.place_child(widget)
+        reactor.add_widget(widget)
+        self._widgets.update({piece: widget})
 
-        # Step 5: Also update fragment label
-        fragment_label = self.ids.fragment_label
-        fragment_label.text = choice["name"]
+    def show_explosion(self, event: dict):
+        """
+        Explodes act and shows the score to be added, the molecule name, and the bonus (if any).
+        :param event: Explode event from CGameEngine.
+        """
+        app = App.get_running_app()
+        act = self.ids.act
+        tube = self.ids.tube
 
-        # Step 6: Stop if no space
-        return not act.collides_with_others(reactor.children)
+        # Create explosion
+        self.explode_act()
+
+        # Show score to be added
+        w, h = act.size
+        x, y = act.pos
+        x += 0.75 * w
+        y += h
+        hover = CHover(text="+" + str(event["value"]))
+        tube.add_widget(hover)
+        hover.size = (0.2 * tube.width, 0.05 * tube.height)
+        hover.pos = (min(x, tube.width - hover.width), y)
+
+        # Show molecule name (if known) or molecular formula
+        molecule = event["molecule"]
+        name = app.molecule_index.get_name(molecule) if app.molecule_index else None
+        name_hover = CHover(text=name if name else molecule.get_formula())
+        tube.add_widget(name_hover)
+        name_hover.size = (0.75 * tube.width, 0.05 * tube.height)
+        name_hover.pos = (max(0, min(act.x, tube.width - name_hover.width)), y + hover.height)
+
+        # Show bonus
+        if event["bonus"]:
+            bonus_hover = CHover(text="+" + str(event["bonus"]))
+            tube.add_widget(bonus_hover)
+            bonus_hover.size = (0.2 * tube.width, 0.05 * tube.height)
+            bonus_hover.pos = (min(x, tube.width - hover.width), y - bonus_hover.height)
+
+    def handle_event(self, event: dict):
+        """
+        Renders an event from CGameEngine.step().
+        :param event: Event dict.
+        """
+        app = App.get_running_app()
+        reactor = self.ids.reactor
+        event_type = event["type"]
+
+        if event_type == "sfx":
+            if event["name"] == "explode":
+                app.sfx["explode"].pitch = 1.0 + 0.5 * (self.engine.effects_random.random() - 0.5)
+                app.sfx["explode"].volume = app.sfx_volume * min(0.5 + event["size"] / 80, 1.0)
+            app.play_sfx(event["name"])
+        elif event_type == "stop_sfx":
+            app.stop_sfx(event["name"])
+
+        elif event_type == "add":
+            self.add_piece_widget(event["piece"])
+        elif event_type == "remove":
+            reactor.remove_widget(self._widgets.pop(event["piece"]))
+        elif event_type == "move":
+            piece = event["piece"]
+            widget = self._widgets[piece]
+            widget.move_to(piece.col, piece.row)
+            reactor.place_child(widget)
+        elif event_type == "set":
+            piece = event["piece"]
+            widget = self._widgets[piece]
+            widget.value = piece.value
+            widget.rgba = piece.rgba
+            reactor.set_child_molecule(widget, piece.molecule, piece.col, piece.row)
+
+        elif event_type == "delocalize":
+            self.ids.act.draw_canvas()
+            self.ids.ghost.draw_canvas()
+            for widget in self._widgets.values():
+                widget.draw_canvas()
+
+        elif event_type == "explode":
+            self.show_explosion(event)
+        elif event_type == "level":
+            self.set_theme()
+        elif event_type == "game_over":
+            self.game_over()
 
     def explode_act(self):
         """
@@ -195,6 +292,7 @@ class CGameScreen(CNaviScreen):
 
         act = self.ids.act
         tube = self.ids.tube
+        rnd = self.engine.effects_random
         img:CoreImage = act.export_as_image()
         triangles: list[CTriangle] = []
 
@@ -203,7 +301,7 @@ class CGameScreen(CNaviScreen):
                 triangles.append(wid)
 
             else:
-                frac = 0.4 + 0.2 * random.random()
+                frac = 0.4 + 0.2 * rnd.random()
                 ff1, ff2 = wid.split_longest(frac)
                 _subdivide(ff1, sub - 1)
                 _subdivide(ff2, sub - 1)
@@ -220,331 +318,55 @@ class CGameScreen(CNaviScreen):
         # Convert to CFlyingTriangle and add physics, and append to _explosion fragments
         for triangle in triangles:
             cft = CFlyingTriangle(triangle)
-            cft.x_velocity = 20.0 - 40.0 * random.random()
-            cft.y_velocity = 30.0 - 40.0 * random.random()
-            cft.spin = 36.0 - 72.0 * random.random()
+            cft.x_velocity = 20.0 - 40.0 * rnd.random()
+            cft.y_velocity = 30.0 - 40.0 * rnd.random()
+            cft.spin = 36.0 - 72.0 * rnd.random()
             cft.y_acceleration = -1.0
             tube.add_widget(cft)
             self._explosion_fragments.append(cft)
 
-    def destroy_act(self):
-        """
-        Proceeds countdown and finally destroys act.
-        """
-        act = self.ids.act
-        app = App.get_running_app()
-        bonus = self.ids.bonus
-        tube = self.ids.tube
-
-        if act.job == "destroy":
-            act.set_job(act.job, {"count": act.params["count"] - 1})
-
-            # Just before explosion
-            if act.params["count"] == 0:
-                app.sfx["explode"].pitch = 1.0 + 0.5 * (random.random() - 0.5)
-                app.sfx["explode"].volume = app.sfx_volume * min(0.5 + act.rows * act.cols / 80, 1.0)
-                app.play_sfx("explode") # Play sound already here due to latency
-
-            # At explosion
-            elif act.params["count"] < 0:
-
-                # Create explosion
-                self.explode_act()
-
-                # Show score to be added
-                w, h = act.size
-                x, y = act.pos
-                x += 0.75 * w
-                y += h
-                hover = CHover(text="+" + str(act.value * 10))
-                tube.add_widget(hover)
-                hover.size = (0.2 * tube.width, 0.05 * tube.height)
-                hover.pos = (min(x, tube.width - hover.width), y)
-
-                # Add score
-                self.nr_molecules += 1
-                self.score += act.value * 10
-
-                # Next level?
-                if self.nr_molecules % 10 == 0:
-                    self.set_theme()
-
-                # Get bonus?
-                if act.molecule.equals(bonus.molecule):
-                    bonus_hover = CHover(text="+" + str(bonus.value))
-                    tube.add_widget(bonus_hover)
-                    bonus_hover.size = (0.2 * tube.width, 0.05 * tube.height)
-                    bonus_hover.pos = (min(x, tube.width - hover.width), y - bonus_hover.height)
-                    self.score += bonus.value
-                    bonus.set_molecule(CMolecule())
-                self.reset_act()
-
-    def merge_to_act(self):
-        """
-        Merges act with the first mergeable molecule widget from reactor's children, takes
-        over its color, adds its value, removes it from reactor.
-        :return: True, if merged. Otherwise, False.
-        """
-
-        act = self.ids.act
-        reactor = self.ids.reactor
-
-        for child in reactor.children:
-            if type(child) is CMoleculeWidget:
-                n_col = min(child.col, act.col)
-                n_row = min(child.row, act.row)
-                if act.molecule.connect(child.molecule, (child.col - act.col, child.row - act.row)):
-                    act.move_to(n_col, n_row)
-                    act.rgba = child.rgba
-                    act.value += child.value
-                    act.cols, act.rows = act.molecule.dim
-                    act.draw_canvas()
-                    reactor.remove_widget(child)
-                    return True
-
-        return False
-
-    def store_act(self):
-        """
-        Merges (if possible) or adds act (single obj) to reactor.
-        """
-
-        app = App.get_running_app()
-        act = self.ids.act
-        reactor = self.ids.reactor
-        bonus = self.ids.bonus
-
-        # Play boom sound
-        app.stop_sfx("drop")
-        if ((act.job == "drop") and (act.params["count"] > 0)) or (act.job in ["play", "move"]):
-            app.play_sfx("boom")
-
-        # Add score
-        if act.job == "drop":
-            self.score += act.params["count"]
-
-        # Check and merge
-        while self.merge_to_act():
-            pass
-
-        # Random color, if not set yet
-        if act.rgba == (0, 0, 0, 0):
-            act.rgba = (random.randint(0, 3) / 3, random.randint(0, 3) / 3, random.randint(0, 3) / 3, 0.25)
-
-        # Destroy act, if complete
-        if not act.molecule.has_free_bonds():
-            act.set_job("destroy", {"count": self.DESTROY_COUNT})
-            app.play_sfx("bonus" if act.molecule.equals(bonus.molecule) else "success")
-
-        # Otherwise, transfer to reactor
-        else:
-            # Copy data to a new molecule widget in reactor
-            act_copy = CMoleculeWidget(name="", value=act.value, col=act.col, row=act.row, dim=act.molecule.dim,
-                                       rgba=act.rgba, job="", params={"count": 0}, size_hint=(None, None))
-            act_copy.set_molecule(act.molecule)
-            act_copy.pos = reactor.x + reactor.width * act_copy.col / reactor.COLS, reactor.y + act_copy.row * reactor.height / reactor.ROWS
-            act_copy.size = (reactor.width * act_copy.cols / reactor.COLS, reactor.height * act_copy.rows / reactor.ROWS)
-            reactor.add_widget(act_copy)
-            pass
-
-            # Reset act
-            self.reset_act()
-
-    def drop_act(self):
-        """
-        Tries to drop the act molecule widget by 1 step. If this is not possible, then act is stored into reactor.
-        :return: True if successful move 1 step down. Otherwise, False.
-        """
-
-        act = self.ids.act
-        reactor = self.ids.reactor
-        app = App.get_running_app()
-
-        # Already last line: Store
-        if act.row == 0:
-            self.store_act()
-            return False
-
-        else:
-            n_row = act.row - 1
-
-            # No collision after move down: move
-            if not act.collides_with_others(reactor.children, row=n_row):
-                act.move_to(act.col, n_row)
-                if act.job == "drop":
-                    act.params["count"] += 1
-                return True
-
-            # Otherwise, just store
-            else:
-                self.store_act()
-                return False
-
-    def drop_molecule_widgets(self):
-        """
-        Stepwisely tries to drop all child molecule widgets from reactor by 1 block until a drop succeeded.
-        :return: True, if at least one molecule widget dropped. Otherwise, False.
-        """
-
-        act = self.ids.act
-        reactor = self.ids.reactor
-
-        # Only run if act connected but empty
-        if act and (not act.molecule):
-            children = reactor.children.copy()
-            cant_drop = []
-
-            # Try to drop each molecule widget directly
-            for child in children:
-                if type(child) is CMoleculeWidget:
-
-                    # Molecule widget has been merged in one of the loops before
-                    if child not in reactor.children:
-                        return True
-
-                    # Transfer child data to act
-                    act.col = child.col
-                    act.row = child.row
-                    act.value = child.value
-                    act.rgba = child.rgba
-                    act.set_job("drop", {"count": 0})
-                    act.set_molecule(child.molecule)
-                    reactor.remove_widget(child)
-
-                    # ... and find the first successful drop
-                    if self.drop_act() or (act.molecule and act.job == "destroy"):
-                        return True
-
-                    # Failed? Keep for drop as a group?
-                    else:
-                        cant_drop.append(child)
-
-            # Try to drop as group (for recursively connected molecules)
-            for cant_drop_widget in cant_drop:
-
-                # Test if molecule widget is floating and find all molecule widgets connected to this molecule widget
-                # and floating too.
-                group = reactor.list_molecule_widgets_if_floating(cant_drop_widget)
-                if group:
-
-                    # Drop the block of blocks by 1 step
-                    for group_widget in group:
-                        group_widget.pos = (group_widget.col, group_widget.row - 1)
-
-                    return True
-
-        return False
-
-    def h_move_act_to(self, col: int):
-        """
-        Moves act horizontally if it still fits into the reactor and doesn't collide with other molecules.
-        :param col: New col.
-        """
-        if ("reactor" in self.ids) and ("act" in self.ids):
-            reactor: CReactor = self.ids.reactor
-            act: CMoleculeWidget = self.ids.act
-
-            if act.col != col:
-                row = act.row
-                if reactor.fits(act.molecule, col, row):
-                    if not reactor.test_collision(act.molecule, col=col, row=act.row):
-                        act.move_to(col, row)
-
-                        app = App.get_running_app()
-                        app.play_sfx("move")
-
     def h_move_act(self, d_col: int):
         """
-        Moves act horizontally if it still fits into the reactor and doesn't collide with other molecules.
+        Requests to move act horizontally. The move is applied on the next timer tick, if legal.
         :param d_col: Change in cols.
         """
-        if ("reactor" in self.ids) and ("act" in self.ids):
-            act: CMoleculeWidget = self.ids.act
-            col = act.col + d_col
-            self.h_move_act_to(col)
+        self._inputs.extend(["left" if d_col < 0 else "right"] * abs(d_col))
 
     def flip_act(self):
         """
-        Flips act horizontally. No collision test needed.
+        Requests to flip act horizontally on the next timer tick.
         """
-        if "act" in self.ids:
-            act: CMoleculeWidget = self.ids.act
-            molecule:CMolecule = act.molecule.copy()
-            molecule.h_flip()
-            act.set_molecule(molecule)
-
-            app = App.get_running_app()
-            app.play_sfx("flip")
+        self._inputs.append("flip")
 
     def rotate_act(self):
         """
-        Rotates act clockwise if it still fits into the reactor and doesn't collide with other molecules.
+        Requests to rotate act clockwise on the next timer tick, if legal.
         """
-        if ("reactor" in self.ids) and ("act" in self.ids):
-            reactor: CReactor = self.ids.reactor
-            act: CMoleculeWidget = self.ids.act
-            molecule: CMolecule = act.molecule.copy()
-            molecule.rotate()
-            if reactor.fits(molecule, act.col, act.row):
-                if not reactor.test_collision(molecule, act.col, act.row):
-                    act.set_molecule(molecule)
+        self._inputs.append("rotate")
 
-                    app = App.get_running_app()
-                    app.play_sfx("flip")
-
-    def create_bonus(self):
+    def drop_act(self):
         """
-        Creates a new bonus molecule.
+        Requests to drop act on the next timer tick.
         """
-        app = App.get_running_app()
-        bonus = self.ids.bonus
+        self._inputs.append("drop")
 
-        # Step 1 in test mode:
-        if app.test_bonus_names:
-            choice = next(b for b in app.bonus_molecules if b["name"] == app.test_bonus_names[0])
-            app.test_bonus_names = app.test_bonus_names[1:] + app.test_bonus_names[:1]
-
-        # Or step 1 in play mode: Check if bonus molecules with value <= level + 1 already in _bonus_molecules
-        # Random insert, but not on last pos
-        else:
-            for bonus_molecule in app.bonus_molecules:
-                if (bonus_molecule not in self._bonus_molecules) and (bonus_molecule["value"] <= 2 + self.nr_molecules // 10):
-                    if len(self._bonus_molecules) > 1:
-                        l = self._bonus_molecules[:-1]
-                        l.insert(random.randrange(start=0, stop=len(l)), bonus_molecule)
-                        self._bonus_molecules = l + [self._bonus_molecules[-1]]
-                    else:
-                        self._bonus_molecules.insert(0, bonus_molecule)
-
-            # Step 2: Get the first bonus molecule and put it back to the end of the list
-            choice = self._bonus_molecules[0]
-            self._bonus_molecules = self._bonus_molecules[1:] + self._bonus_molecules[:1]
-
-        # Step 3: New block from random selection
-        bonus.name = choice["name"]
-        bonus.value = fib(choice["value"] + 1) * 100
-        bonus.set_molecule(CMolecule(name=choice["name"], atoms=app.atoms, txt=choice["data"]))
+    def hard_drop_act(self):
+        """
+        Requests to drop act straight to its landing row on the next timer tick.
+        """
+        self._inputs.append("hard_drop")
 
     def respond_to_controls(self, **kwargs):
         app = App.get_running_app()
-        act = self.ids.act
 
-        if (app.left_control in app.controls) and (app.controls[app.left_control].equals(**kwargs)):
-            self.h_move_act(-1)
-            return True
-        if (app.right_control in app.controls) and (app.controls[app.right_control].equals(**kwargs)):
-            self.h_move_act(1)
-            return True
-        if (app.flip_control in app.controls) and (app.controls[app.flip_control].equals(**kwargs)):
-            self.flip_act()
-            return True
-        if (app.rotate_control in app.controls) and (app.controls[app.rotate_control].equals(**kwargs)):
-            self.rotate_act()
-            return True
-        if (app.drop_control in app.controls) and (app.controls[app.drop_control].equals(**kwargs)):
-            act.set_job("drop", {"count": 1})
-            app.play_sfx("drop")
-            return True
+        for control, command in ((app.left_control, "left"),
+                                 (app.right_control, "right"),
+                                 (app.flip_control, "flip"),
+                                 (app.rotate_control, "rotate"),
+                                 (app.drop_control, "drop")):
+            if (control in app.controls) and (app.controls[control].equals(**kwargs)):
+                self._inputs.append(command)
+                return True
 
         return False
 
@@ -555,18 +377,17 @@ class CGameScreen(CNaviScreen):
         :param event: MotionEvent.
         :return: True of origin inside rector. Otherwise, False.
         """
-        act = self.ids.act
         reactor = self.ids.reactor
 
-        if (act.job == "move") and reactor.collide_point(event.ox, event.oy):
-            dx = (event.x - act.params["opos"][0]) / (reactor.width / reactor.COLS)
-            dy = (event.y - act.params["opos"][1]) / (reactor.height / reactor.ROWS)
+        if (self._touch_opos is not None) and reactor.collide_point(event.ox, event.oy):
+            dx = (event.x - self._touch_opos[0]) / (reactor.width / reactor.cols)
+            dy = (event.y - self._touch_opos[1]) / (reactor.height / reactor.rows)
             if self.respond_to_controls(type=["touch", "move"],
                                         dx=dx,
                                         dy=dy,
                                         is_double_tap=event.is_double_tap,
                                         is_triple_tap=event.is_triple_tap):
-                act.params["opos"] = (event.x, event.y)
+                self._touch_opos = (event.x, event.y)
                 return True
 
         return False
@@ -578,12 +399,11 @@ class CGameScreen(CNaviScreen):
         :param event: MotionEvent.
         :return: True of origin inside rector. Otherwise, False.
         """
-        act = self.ids.act
         reactor = self.ids.reactor
 
-        if act.job == "play" and reactor.collide_point(event.ox, event.oy):
-            act.params.update({"opos": event.opos})
-            act.set_job("move", act.params)
+        if self.engine and (self.engine.act.job == "play") and reactor.collide_point(event.ox, event.oy):
+            self._touch_opos = event.opos
+            self._inputs.append("grab")
             return True
 
         return False
@@ -595,16 +415,16 @@ class CGameScreen(CNaviScreen):
         :param event: MotionEvent.
         :return: True of origin inside rector. Otherwise, False.
         """
-        act = self.ids.act
         reactor = self.ids.reactor
 
         if reactor.collide_point(event.ox, event.oy):
 
-            if act.job == "move":
-                act.set_job("play", {"count": act.params["count"]})
+            if self._touch_opos is not None:
+                self._touch_opos = None
+                self._inputs.append("release")
 
-            dx = (event.x - event.ox) / (reactor.width / reactor.COLS)
-            dy = (event.y - event.oy) / (reactor.height / reactor.ROWS)
+            dx = (event.x - event.ox) / (reactor.width / reactor.cols)
+            dy = (event.y - event.oy) / (reactor.height / reactor.rows)
             if self.respond_to_controls(type=["touch", "up"],
                                         dx=dx,
                                         dy=dy,
@@ -630,7 +450,7 @@ class CGameScreen(CNaviScreen):
         :return: Always return True to prevent App.stop() on <ESC>.
         """
 
-        act = self.ids.act
+        playing = (self.engine is not None) and (self.engine.act.job == "play")
         key = Keyboard.keycode_to_string(obj, keycode)
 
         # Config-independent keys:
@@ -638,9 +458,11 @@ class CGameScreen(CNaviScreen):
             self.start_stop_timer()
         elif key == self.MENU_KEY:
             self.on_key_escape()
+        elif (key == self.HARD_DROP_KEY) and playing:
+            self.hard_drop_act()
 
         # Forward gaming keys
-        elif act.job == "play":
+        elif playing:
             self.respond_to_controls(type=["key", "down"], keycode=key)
 
         return True
@@ -662,16 +484,14 @@ class CGameScreen(CNaviScreen):
             axis.update({"dx": 0.0, "value": 0.0})
 
     def on_joy_hat(self, win, joy_id, hat_id, value):
-        act = self.ids.act
-        if act.job == "play":
+        if (self.engine is not None) and (self.engine.act.job == "play"):
             self.respond_to_controls(type=["joy", "hat"], joy_id=joy_id, hat_id=hat_id, dx=value[0], dy=value[1])
 
     def on_joy_button_down(self, win, joy_id, button_id):
         if button_id == self.JOYSTICK_ESCAPE_BUTTON:
             return self.on_key_escape()
 
-        act = self.ids.act
-        if act.job == "play":
+        if (self.engine is not None) and (self.engine.act.job == "play"):
             self.respond_to_controls(type=["joy", "button", "down"], joy_id=joy_id, button_id=button_id)
 
     def on_time(self, *args):
@@ -681,16 +501,11 @@ class CGameScreen(CNaviScreen):
         """
 
         # Not ready
-        if ("act" not in self.ids) or ("reactor" not in self.ids) or ("tube" not in self.ids):
+        if ("act" not in self.ids) or ("reactor" not in self.ids) or ("tube" not in self.ids) or (self.engine is None):
             return
 
-        act: CMoleculeWidget = self.ids.act
-        reactor: CReactor = self.ids.reactor
-        bonus: CMoleculeWidget = self.ids.bonus
         tube: RelativeLayout = self.ids.tube
 
-        self._time += 1
-
         # Handle joystick axis devices
         for joy_id, joystick in self._joystick_axes.items():
             for axis_id, axis in joystick.items():
@@ -703,10 +518,14 @@ class CGameScreen(CNaviScreen):
                         value -= value / abs(value)
                     axis.update({"value": value})
 
-        # Rotate free bonds every n cycles
-        if self._time % 40 == 0:
-            act.delocalize_free_bonds()
-            reactor.delocalize_free_bonds()
+        # Proceed the game with the collected inputs and render the result. Events are rendered before the update, as
+        # they may refer to the previous state (e.g., the exploding act).
+        inputs = self._inputs
+        self._inputs = []
+        self.recording.record(self.engine, inputs)
+        for event in self.engine.step(inputs):
+            self.handle_event(event)
+        self.update_widgets()
 
         # Fade out hovers
         hovers = [child for child in tube.children if type(child) is CHover]
@@ -724,32 +543,6 @@ class CGameScreen(CNaviScreen):
                 tube.remove_widget(ef)
                 self._explosion_fragments.remove(ef)
 
-        # Empty molecule: Cleanup reactor
-        # Try to drop all floating molecule widgets. Otherwise, spawn a new molecule and check if to create a new bonus
-        # molecule.
-        if not act.molecule:
-            if not self.drop_molecule_widgets():
-                if not bonus.molecule:
-                    self.create_bonus()
-                if not self.spawn_act():
-                    self.game_over()
-
-        elif act.job == "destroy":
-            self.destroy_act()
-
-        elif act.job in ["play", "move"]:
-            act.params["count"] += 1
-
-            # Level-dependent number of cycles before drop to the next line
-            # Starting with 10 cycles for level 1 (0..9 nr_molecules) til 1 cycle, 20% less for each level compared to the
-            # previous one.
-            if act.params["count"] >= 1.0 + 19.0 * (0.8 ** (self.nr_molecules // 10)):
-                act.params["count"] = 0
-                self.drop_act()
-
-        elif act.job == "drop":
-            self.drop_act()
-
     def switch_to_scores_screen(self, *args):
         self.manager.current = "scores_screen"
 
@@ -764,4 +557,4 @@ class CGameScreen(CNaviScreen):
 
     def on_leave(self, *args):
         self.stop_timer()
-        super().on_leave(*args)
\ No newline at end of file
+        super().on_leave(*args)
@@ -0,0 +1,144 @@
+from cmolecule import CMolecule
+from coccupancy import COccupancy
+from csupportgraph import CSupportGraph
+
+
+class CBody:
+    """
+    A molecule placed in a reactor, as used by CGravity. The owner refers to the represented object (e.g., a
+    CMoleculeWidget).
+    """
+    __slots__ = ("molecule", "col", "row", "owner")
+
+    def __init__(self, molecule: CMolecule, col: int, row: int, owner=None):
+        self.molecule = molecule
+        self.col = col
+        self.row = row
+        self.owner = owner
+
+
+class CGravity:
+    """
+    Logic-only gravity and cascade solver for the reactor cleanup phase. CGravity drops all floating bodies (also
+    groups of bodies resting on each other) to their resting positions and resolves the merges caused by these drops.
+    The solver works on the molecule model only. It never changes the molecules of the bodies, but replaces them by
+    (merged) copies.
+    """
+
+    def __init__(self, cols: int, rows: int):
+        """
+        Creates a solver.
+        :param cols: Number of reactor columns.
+        :param rows: Number of reactor rows.
+        """
+        self.cols = cols
+        self.rows = rows
+
+    def settle(self, bodies: list[CBody]):
+        """
+        Drops all floating bodies until all bodies rest on the ground or on other resting bodies. A floating group of
+        bodies drops as a whole.
+        :param bodies: List of CBody. The rows of the bodies are changed.
+        :return: Dict with the number of dropped rows for each dropped body.
+        """
+        support = CSupportGraph(self.cols, self.rows)
+        for body in bodies:
+            support.add(body, body.molecule, body.col, body.row)
+
+        # Drop all floating bodies until none is floating. Floating bodies don't rest on grounded bodies, thus they can
+        # all drop together until the first of them lands.
+        drops = {}
+        floating = support.list_floating()
+        while floating:
+            drop = support.get_floating_drop()
+            for body in floating:
+                support.remove(body)
+            for body in floating:
+                body.row -= drop
+                drops.update({body: drops.get(body, 0) + drop})
+                support.add(body, body.molecule, body.col, body.row)
+            floating = support.list_floating()
+
+        return drops
+
+    def merge(self, bodies: list[CBody], stop_if_complete=True):
+        """
+        Merges touching bodies if they can connect. Each body absorbs the first other body it connects with (in list
+        order), until no more connection is possible. Only neighboring bodies are tried.
+        :param bodies: List of CBody. Absorbed bodies are removed from the list, merged bodies get a new molecule and
+        position.
+        :param stop_if_complete: If True (default), stop after the first merged body without free bonds.
+        :return: Tuple of (i) list of merges as tuples (absorbing body, absorbed body) in the order of merge, and (ii)
+        list of all bodies without free bonds.
+        """
+        occupancy = COccupancy(self.cols, self.rows)
+        order = {}
+        for i, body in enumerate(bodies):
+            occupancy.add(body, body.molecule, body.col, body.row)
+            order.update({body: i})
+
+        merges = []
+        complete = []
+        i = 0
+        while i < len(bodies):
+            body = bodies[i]
+            merged = True
+            while merged:
+                merged = False
+                for other in sorted(occupancy.list_neighbors(body.molecule, body.col, body.row), key=order.get):
+                    pos = (other.col - body.col, other.row - body.row)
+                    molecule = body.molecule.copy()
+                    if molecule.connect(other.molecule, pos):
+                        body.molecule = molecule
+                        body.col = min(body.col, other.col)
+                        body.row = min(body.row, other.row)
+                        merges.append((body, other))
+                        bodies.remove(other)
+                        occupancy.remove(other)
+                        occupancy.add(body, body.molecule, body.col, body.row)
+                        merged = True
+                        break
+
+            i = bodies.index(body) + 1
+            if not body.molecule.has_free_bonds():
+                complete.append(body)
+                if stop_if_complete:
+                    break
+
+        return merges, complete
+
+    def step(self, bodies: list[CBody]):
+        """
+        Performs one cleanup round: Drops all floating bodies to their resting positions and resolves the merges caused
+        by the drops. Stops at the first merged body without free bonds.
+        :param bodies: List of CBody. The list and the bodies are changed, see settle() and merge().
+        :return: Dict with drops (dict of dropped rows by body), rests (dict of the resting row by dropped body, before
+        merging), merges (list of tuples (absorbing body, absorbed body)), and complete (first body without free bonds or
+        None). Or None if there is nothing to do.
+        """
+        drops = self.settle(bodies)
+
+        # Merged bodies take the position of the merged molecule. Thus, keep the resting rows before merging.
+        rests = {body: body.row for body in drops}
+        merges, complete = self.merge(bodies)
+        if not (drops or merges or complete):
+            return None
+
+        return {"drops": drops, "rests": rests, "merges": merges, "complete": complete[0] if complete else None}
+
+    def solve(self, bodies: list[CBody]):
+        """
+        Performs cleanup rounds until all bodies rest and no more merges are possible. Bodies without free bonds are
+        removed after each round.
+        :param bodies: List of CBody. The list and the bodies are changed, see settle() and merge().
+        :return: List of the results of all rounds, see step().
+        """
+        results = []
+        while True:
+            result = self.step(bodies)
+            if result is None:
+                return results
+
+            results.append(result)
+            if result["complete"] is not None:
+                bodies.remove(result["complete"])
@@ -1,4 +1,23 @@
 #import kivy
+import sys
+from runpy import run_module
+
+def get_batch_module(argv):
+    """
+    Gets the module for a headless batch run. Options may also be given as "--option=value".
+    :param argv: Command line arguments.
+    :return: "canalyzer" for --analyze, "csimulation" for --simulate, otherwise None.
+    """
+    options = {arg.partition("=")[0] for arg in argv}
+    return "canalyzer" if "--analyze" in options else "csimulation" if "--simulate" in options else None
+
+
+if (__name__ == "__main__") and get_batch_module(sys.argv[1:]):
+    # Headless batch simulation (see csimulation.py) or balance analysis (see canalyzer.py) without Kivy. Run as main
+    # module, thus spawned worker processes import the module instead of this file.
+    run_module(get_batch_module(sys.argv[1:]), run_name="__main__", alter_sys=True)
+    sys.exit()
+
 from os import makedirs
 from os.path import join, dirname, isfile
 from json import load as load_json, dumps
@@ -14,8 +33,8 @@ from ccontrol import CControl
 # Ugly hack to init SoundLoader before UI
 temp = SoundLoader.load("None.mp3")
 
-from catom import  CAtom
 from cmenuscreen import CMenuScreen
+from cmoleculeindex import CMoleculeIndex
 from csettingsscreen import CSettingsScreen
 from cgamescreen import CGameScreen
 from cscoresscreen import CScoresScreen
@@ -24,6 +43,7 @@ from creactor import CReactor
 from cbutton import CButton
 from ctext import CText
 from cspinner import CSpinner
+from cgamedata import load_atoms, load_molecules
 
 __version__ = "0.1"
 
@@ -87,6 +107,7 @@ class CHONApp(App):
     bonus_molecules = {}
     fragments = []
     bonus_molecules = []
+    molecule_index = None
     bond_image = None
     free_image = None
     number_textures = []
@@ -112,6 +133,8 @@ class CHONApp(App):
 
     # Other config data
     controls = None
+    reactor_cols = CReactor.COLS
+    reactor_rows = CReactor.ROWS
 
     # Tests
     test_bonus_names = []
@@ -133,31 +156,40 @@ class CHONApp(App):
         Loads atom data from <DATA_PATH>/atoms.json.
         """
         self.atoms.clear()
-        with open(join(self.DATA_PATH, "atoms.json"), "r", encoding="utf8") as read_file:
-            atoms_data = load_json(read_file)
-            for a in atoms_data:
-                atom = CAtom.from_dict(a)
-                self.atoms.update({a["symbol"]: atom})
+        self.atoms.update(load_atoms(join(self.DATA_PATH, "atoms.json")))
 
     def load_fragments(self):
         """
-        Loads molecule fragment data from <DATA_PATH>/fragments.json.
+        Loads molecule fragment data from <DATA_PATH>/fragments.json and precomputes all orientations of each fragment
+        molecule. Requires atoms.
         """
         self.fragments.clear()
-        with open(join(self.DATA_PATH, "fragments.json"), "r", encoding="utf8") as read_file:
-            fragments_data = load_json(read_file)
-            for f in fragments_data:
-                self.fragments.append(f)
+        self.fragments.extend(load_molecules(join(self.DATA_PATH, "fragments.json"), self.atoms))
 
     def load_bonus_molecules(self):
         """
-        Loads bonus molecule data from <DATA_PATH>/bonus.json.
+        Loads bonus molecule data from <DATA_PATH>/bonus.json and precomputes all orientations of each bonus molecule.
+        Requires atoms.
         """
         self.bonus_molecules.clear()
-        with open(join(self.DATA_PATH, "bonus.json"), "r", encoding="utf8") as read_file:
-            bonus_data = load_json(read_file)
-            for f in bonus_data:
-                self.bonus_molecules.append(f)
+        self.bonus_molecules.extend(load_molecules(join(self.DATA_PATH, "bonus.json"), self.atoms))
+
+    def load_molecule_index(self):
+        """
+        Creates the molecule index from the bonus molecules and, if provided, from the user-supplied molecule list
+        <user_data_dir>/molecules.json. The user-supplied list is indexed in <user_data_dir>/molecules.idx. An unreadable
+        or malformed user-supplied list is skipped.
+        """
+        self.molecule_index = CMoleculeIndex(self.atoms)
+        for b in self.bonus_molecules:
+            self.molecule_index.add(b["name"], b["molecule"])
+
+        molecules_filename = join(self.user_data_dir, "molecules.json")
+        if isfile(molecules_filename):
+            try:
+                self.molecule_index.load_mapped(molecules_filename, join(self.user_data_dir, "molecules.idx"))
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as err:
+                print("Error: Can't load molecule list {}: {}".format(molecules_filename, err), file=sys.stderr)
 
     def load_images(self):
         """
@@ -205,6 +237,15 @@ class CHONApp(App):
                 if "rotate" in config["controls"]: self.rotate_control = config["controls"]["rotate"]
                 if "drop" in config["controls"]: self.drop_control = config["controls"]["drop"]
 
+            if "reactor" in config:
+                # Fall back to the default dimension for invalid values
+                cols = config["reactor"].get("cols", self.reactor_cols)
+                rows = config["reactor"].get("rows", self.reactor_rows)
+                valid_cols = isinstance(cols, int) and (1 <= cols <= CReactor.MAX_COLS)
+                valid_rows = isinstance(rows, int) and (1 <= rows <= CReactor.MAX_ROWS)
+                self.reactor_cols = cols if valid_cols else CReactor.COLS
+                self.reactor_rows = rows if valid_rows else CReactor.ROWS
+
             if "audio" in config:
                 if "sfx" in config["audio"]:
                     if "volume" in config["audio"]["sfx"]: self.sfx_volume = config["audio"]["sfx"]["volume"]
@@ -227,6 +268,12 @@ class CHONApp(App):
                                 "drop": self.drop_control
                             },
 
+                        "reactor":
+                            {
+                                "cols": self.reactor_cols,
+                                "rows": self.reactor_rows
+                            },
+
                         "audio":
                             {
                                 "sfx": {"volume":  self.sfx_volume},
@@ -434,6 +481,7 @@ class CHONApp(App):
         self.load_atoms()
         self.load_fragments()
         self.load_bonus_molecules()
+        self.load_molecule_index()
         self.load_images()
         self.load_sfx()
         self.load_user_config()
@@ -454,6 +502,13 @@ class CHONApp(App):
         menu_screen = self.root.screens[0]
         menu_screen.after_init()
 
+    def on_stop(self):
+        """
+        Callback for stopping the application. Closes the molecule index files.
+        """
+        if self.molecule_index is not None:
+            self.molecule_index.close()
+
 
 if __name__ == '__main__':
     CHONApp().run()
\ No newline at end of file
@@ -1,17 +1,134 @@
 from catom import CAtom
-from ctools import char_to_bond
+from ctools import bond_to_char, char_to_bond
 
 
 class CMolecule:
+    ORIENTATIONS = 8
+    """
+    Number of orientations: 4 rotations, each also horizontally flipped.
+    """
+    PHASES = 12
+    """
+    Number of different electron delocalization steps before the free electrons are back in place (lcm of 1..4).
+    """
+
     def __init__(self, name: str = "", dim: tuple[int, int] = (0, 0), atoms: dict[str, None | CAtom] | None = None,
                  txt: list[str] | None = None):
         self.name: str = name
         self.dim: tuple[int, int] = dim
+        # Flat, row-major cell buffer: The atom at position (x, y) is stored at index y * dim[0] + x
+        self.data: list[None | CAtom] = [None] * (dim[0] * dim[1])
+        # Bond graph: Neighbor indices with bond type for each atom, both by flat cell index
+        self.adjacency: dict[int, dict[int, int]] = {}
+
+        # Copy-on-write: Copies share data and adjacency (_shared) and the atoms until they are changed. Only the atoms
+        # in _owned are private to this object and may be changed in place.
+        self._shared: bool = False
+        self._owned: set[CAtom] = set()
+        self._masks: tuple[int, ...] | None = None
+        self._bottoms: tuple[int | None, ...] | None = None
+        self._canonical: str | None = None
+
+        # Running statistics: Atoms for each symbol, atom directions for each bond type 1..3, and free electrons
+        self._atom_counts: dict[str, int] = {}
+        self._bound_counts: list[int] = [0, 0, 0, 0]
+        self._free_count: int = 0
+
+        # Orientation cache shared by all copies of a template, see create_orientations()
+        self._orientations: dict[tuple[int, int], "CMolecule"] | None = None
+        self._orientation: tuple[int, int] = (0, 0)
+
         if txt and atoms:
-            self.data: list = []
             self.parse(atoms, txt)
+
+    def invalidate(self):
+        """
+        Drops all cached data derived from the atoms and their bonds. Must be called after each change of data, dim, or
+        bonds.
+        """
+        self._masks = None
+        self._bottoms = None
+        self._canonical = None
+        self._orientations = None
+
+    def unshare(self):
+        """
+        Makes data and adjacency private to this object before they are changed in place. The atoms are still shared,
+        see own_atom().
+        """
+        if self._shared:
+            self.data = self.data.copy()
+            self.adjacency = {i: neighbors.copy() for i, neighbors in self.adjacency.items()}
+            self._shared = False
+
+    def own_atom(self, index):
+        """
+        Gets a private atom for a cell before the atom is changed in place. Shared atoms are copied first.
+        :param index: Flat cell index.
+        :return: CAtom owned by this object.
+        """
+        atom = self.data[index]
+        if atom not in self._owned:
+            self.unshare()
+            atom = atom.copy()
+            self.data[index] = atom
+            self._owned.add(atom)
+        return atom
+
+    def update_statistics(self, atom, sign=1):
+        """
+        Adds the contribution of an atom to the running statistics of this molecule or removes it.
+        :param atom: CAtom.
+        :param sign: 1 to add or -1 to remove the atom.
+        """
+        symbol = atom.symbol
+        nr = self._atom_counts.get(symbol, 0) + sign
+        if nr:
+            self._atom_counts[symbol] = nr
         else:
-            self.data: list[list[None | CAtom]] = [[None for __ in range(dim[0])] for _ in range(dim[1])]
+            self._atom_counts.pop(symbol, None)
+
+        self._free_count += sign * atom.count_free()
+        for direction in range(4):
+            bond = atom.get_bound(direction)
+            if bond:
+                self._bound_counts[bond] += sign
+
+    def reset_statistics(self):
+        """
+        Recalculates the running statistics of this molecule from scratch.
+        """
+        self._atom_counts = {}
+        self._bound_counts = [0, 0, 0, 0]
+        self._free_count = 0
+        for atom in self.data:
+            if atom:
+                self.update_statistics(atom)
+
+    def reset_adjacency(self):
+        """
+        Rebuilds the bond graph of this molecule from scratch.
+        """
+        w, h = self.dim
+        self.adjacency = {i: {} for i, atom in enumerate(self.data) if atom}
+        for i, neighbors in self.adjacency.items():
+            atom = self.data[i]
+            for direction in range(4):
+                bond = atom.get_bound(direction)
+                if bond:
+                    dx, dy = CAtom.move(direction)
+                    x = i % w + dx
+                    y = i // w + dy
+                    if (0 <= x < w) and (0 <= y < h) and self.data[y * w + x]:
+                        neighbors.update({y * w + x: bond})
+
+    def remap_adjacency(self, index_map):
+        """
+        Moves the bond graph to new cell indices (e.g., after rotation or resize).
+        :param index_map: Function which maps an old flat cell index to the new one.
+        """
+        self.adjacency = {index_map(i): {index_map(j): bond for j, bond in neighbors.items()}
+                          for i, neighbors in self.adjacency.items()}
 
     def parse(self, atoms: dict[str, None | CAtom], txt: list[str]):
         """
@@ -20,50 +137,130 @@ class CMolecule:
         :param txt: Formatted text.
         """
 
-        # Step 1: Remove empty lines
-        txt1 = [line for line in txt if not line.isspace()]
+        # Step 1: Get the lines without leading and trailing empty lines and the margins. Empty lines in between are
+        # kept, e.g. bond lines between two atom rows without vertical bonds.
+        filled = [i for i, line in enumerate(txt) if line.strip()]
+        lines = txt[filled[0]:filled[-1] + 1]
+        left = min(len(line) - len(line.lstrip()) for line in lines if line.strip())
+        right = max(len(line.rstrip()) for line in lines)
+        rows = (len(lines) + 1) // 2
+        cols = (right - left + 1) // 2
+
+        # Step 2: Map all atoms and collect the bonds (vertical bonds first, as they are connected first)
+        data = [None] * (cols * rows)
+        v_bonds = []
+        h_bonds = []
+        for r, line in enumerate(lines):
+            row = r // 2
+            length = len(line)
+            for col in range(cols):
+                c = left + 2 * col
+                char = line[c] if c < length else " "
+                if r % 2:
+                    nr = char_to_bond(char)
+                    if nr:
+                        v_bonds.append(((col, row), (col, row + 1), 2, nr))
+                    continue
+
+                if char in atoms:
+                    data[row * cols + col] = atoms[char].copy()
+                elif char != " ":
+                    raise ValueError("Invalid atom symbol '" + char + "' in " + self.name + " at position (" + str(col) + ", " + str(row) + ")")
+                nr = char_to_bond(line[c + 1]) if c + 1 < length else 0
+                if nr and (col < cols - 1):
+                    h_bonds.append(((col, row), (col + 1, row), 1, nr))
+
+        # Step 3: Build connections and remove free electrons clockwise starting with connection direction
+        for pos1, pos2, direction, nr in v_bonds + h_bonds:
+            atom1 = data[pos1[1] * cols + pos1[0]]
+            atom2 = data[pos2[1] * cols + pos2[0]]
+            if not (atom1 and atom2):
+                raise ValueError("Invalid bond in " + self.name + " at position (" + str(pos1[0]) + ", " + str(pos1[1]) + "): Bonds must connect two atoms")
+            if min(atom1.count_free(), atom2.count_free()) < nr:
+                raise ValueError("Invalid bond in " + self.name + " at position (" + str(pos1[0]) + ", " + str(pos1[1]) + "): More bonds than available")
+            atom1.bind(direction, nr)
+            atom2.bind(CAtom.opposite_direction(direction), nr)
+
+        # Step 4: Link data
+        self.dim = (cols, rows)
+        self.data = data
+        self._shared = False
+        self._owned = {atom for atom in data if atom}
+        self.reset_adjacency()
+        self.reset_statistics()
+        self.invalidate()
+
+    def to_text(self):
+        """
+        Creates a formatted text from the molecule data. The formatted text represents a 2D array with single char
+        symbol letters for the atoms and bond chars (-, =, ≡ horizontally and |, ‖, ⦀ vertically) between the atom
+        symbols. See parse().
+        :return: Formatted text as list of lines.
+        """
+        w, h = self.dim
+        txt = []
+        for y in range(h):
+            row = self.data[y * w:(y + 1) * w]
+            line = []
+            bonds = []
+            for atom in row:
+                if atom:
+                    line.append(atom.symbol)
+                    line.append(bond_to_char(atom.get_bound(1)))
+                    bonds.append(bond_to_char(atom.get_bound(2), vertical=True))
+                else:
+                    line.append("  ")
+                    bonds.append(" ")
+            txt.append("".join(line)[:2 * w - 1])
+            if y < h - 1:
+                txt.append(" ".join(bonds))
 
-        # Step 2: Remove spaces left and right
-        left = min([(len(line) - len(line.lstrip())) for line in txt1])
-        txt2 = [line[left:] for line in txt1]
-        right = max([len(line.rstrip()) for line in txt2])
-        txt3 = [line[:right] for line in txt2]
+        return txt
 
-        # Step 2: Check dimensions and resize if needed
-        rows = (len(txt3) + 1) // 2
-        cols = (right + 1) // 2
-        if (cols, rows) != self.dim:
-            self.dim = (cols, rows)
-            self.data = [[None for __ in range(cols)] for _ in range(rows)]
+    def to_line(self):
+        """
+        Creates a compact single-line text from the molecule data. In contrast to to_text(), the line contains the full
+        bond state of each atom including the placement of the free electrons. See from_line().
+        :return: Single-line text: Dimensions (e.g., "3x2:"), followed by each cell (row by row): Either "." if empty or
+        the atom symbol followed by its state as 4 hex digits.
+        """
+        return str(self.dim[0]) + "x" + str(self.dim[1]) + ":" + "".join(
+            "%s%04x" % (atom.element.symbol, atom.state) if atom else "." for atom in self.data)
 
-        # Step 3: Map all atoms
-        for row in range(rows):
-            line = txt3[2 * row]
-            for col in range(cols):
-                symbol = line[2 * col]
-                if symbol in atoms:
-                    atom = atoms[symbol]
-                    self.set_atom((col, row), atom.copy())
-                elif symbol != ' ':
-                    raise ValueError("Invalid atom symbol '" + symbol + "' in " + self.name + " at position (" + str(col) + ", " + str(row) + ")")
-
-        # Step 4: Build connections vertically
-        for row in range(rows - 1):
-            line = txt3[2 * row + 1]
-            for col in range(cols):
-                char = line[2 * col]
-                nr = char_to_bond(char)
-                if nr:
-                    self.connect_atoms((col, row), (col, row + 1), nr=nr)
-
-        # Step 5: Build connections horizontally
-        for row in range(rows):
-            line = txt3[2 * row]
-            for col in range(cols - 1):
-                char = line[2 * col + 1]
-                nr = char_to_bond(char)
-                if nr:
-                    self.connect_atoms((col, row), (col + 1, row), nr=nr)
+    @classmethod
+    def from_line(cls, atoms: dict[str, None | CAtom], line: str, name: str = ""):
+        """
+        Creates a CMolecule object from a compact single-line text. See to_line().
+        :param atoms: Dict containing the atoms.
+        :param line: Single-line text.
+        :param name: Optional, molecule name.
+        :return: Created CMolecule.
+        :raises ValueError: If the line is malformed or contains invalid atom symbols.
+        """
+        try:
+            dim, cells = line.split(":", 1)
+            w, h = (int(value) for value in dim.split("x"))
+            data = []
+            i = 0
+            while i < len(cells):
+                if cells[i] == ".":
+                    data.append(None)
+                    i += 1
+                else:
+                    data.append(CAtom(atoms[cells[i]].element, int(cells[i + 1:i + 5], 16)))
+                    i += 5
+        except (KeyError, ValueError) as e:
+            raise ValueError("Invalid molecule line '" + line + "'") from e
+        if len(data) != w * h:
+            raise ValueError("Invalid molecule line '" + line + "': Number of cells doesn't match the dimensions")
+
+        m = cls(name)
+        m.dim = (w, h)
+        m.data = data
+        m._owned = {atom for atom in data if atom}
+        m.reset_adjacency()
+        m.reset_statistics()
+        return m
 
     def get_atom(self, position):
         """
@@ -72,7 +269,7 @@ class CMolecule:
         :return: CAtom
         """
         x, y = position
-        return self.data[y][x]
+        return self.data[y * self.dim[0] + x]
 
     def set_atom(self, position, atom):
         """
@@ -81,7 +278,29 @@ class CMolecule:
         :param atom: CAtom.
         """
         x, y = position
-        self.data[y][x] = atom
+        w, h = self.dim
+        index = y * w + x
+        self.unshare()
+        if self.data[index]:
+            self.update_statistics(self.data[index], -1)
+            self._owned.discard(self.data[index])
+            for j in self.adjacency.pop(index):
+                del self.adjacency[j][index]
+        if atom:
+            self.update_statistics(atom)
+            neighbors = {}
+            for direction in range(4):
+                bond = atom.get_bound(direction)
+                if bond:
+                    dx, dy = CAtom.move(direction)
+                    j = (y + dy) * w + x + dx
+                    if (0 <= x + dx < w) and (0 <= y + dy < h) and self.data[j]:
+                        neighbors.update({j: bond})
+                        self.adjacency[j].update({index: bond})
+            self.adjacency.update({index: neighbors})
+            self._owned.add(atom)
+        self.data[index] = atom
+        self.invalidate()
 
     def disconnect_atoms(self, pos1, pos2):
         """
@@ -107,18 +326,27 @@ class CMolecule:
         # Step 3: Validate existing connection
         dir1 = CAtom.direction((dx, dy))
         dir2 = CAtom.opposite_direction(dir1)
-        nr_bound1 = atom1.bonds["bound"][dir1]
-        nr_bound2 = atom2.bonds["bound"][dir2]
+        nr_bound1 = atom1.get_bound(dir1)
+        nr_bound2 = atom2.get_bound(dir2)
         if nr_bound1 != nr_bound2:
             raise ValueError("Incorrect data in CMolecule.data")
 
-        # Step 4: Remove bound
-        atom1.bonds["bound"][dir1] = 0
-        atom2.bonds["bound"][dir2] = 0
-
-        # Step 5: Add free
-        atom1.bonds["free"][dir1] += nr_bound1
-        atom2.bonds["free"][dir2] += nr_bound2
+        # Step 4: Remove bound and add free. Nothing to do if there is no connection.
+        if not nr_bound1:
+            return
+        index1 = pos1[1] * self.dim[0] + pos1[0]
+        index2 = pos2[1] * self.dim[0] + pos2[0]
+        atom1 = self.own_atom(index1)
+        atom2 = self.own_atom(index2)
+        self.update_statistics(atom1, -1)
+        self.update_statistics(atom2, -1)
+        atom1.unbind(dir1)
+        atom2.unbind(dir2)
+        self.update_statistics(atom1)
+        self.update_statistics(atom2)
+        self.adjacency[index1].pop(index2, None)
+        self.adjacency[index2].pop(index1, None)
+        self.invalidate()
 
 
     def is_connected(self, pos1, pos2):
@@ -147,8 +375,8 @@ class CMolecule:
         # Step 3: Validate existing connection
         dir1 = CAtom.direction((dx, dy))
         dir2 = CAtom.opposite_direction(dir1)
-        nr_bound1 = atom1.bonds["bound"][dir1]
-        nr_bound2 = atom2.bonds["bound"][dir2]
+        nr_bound1 = atom1.get_bound(dir1)
+        nr_bound2 = atom2.get_bound(dir2)
         if nr_bound1 != nr_bound2:
             raise ValueError("Incorrect data in CMolecule.data")
 
@@ -188,44 +416,71 @@ class CMolecule:
         self.disconnect_atoms(pos1, pos2)
 
         # Step 5: Get max number of bonds possible
-        free1 = sum(atom1.bonds["free"])
-        free2 = sum(atom2.bonds["free"])
+        free1 = atom1.count_free()
+        free2 = atom2.count_free()
         max_nr = min((free1, free2))
         if (max_nr < nr) and pedantic:
             raise ValueError("Invalid value for nr: More bonds requested than available. Maybe use pedantic=False instead.")
         bonds = max_nr if (max_nr < nr) else nr
 
-        # Step 6: Connect
+        # Step 6: Connect and remove free clockwise starting with connection direction
+        if not bonds:
+            return False
         dir1 = CAtom.direction((dx, dy))
         dir2 = CAtom.opposite_direction(dir1)
-        atom1.bonds["bound"][dir1] = bonds
-        atom2.bonds["bound"][dir2] = bonds
-
-        # Step 7: Remove free clockwise starting with connection direction
-        # First
-        directions1 = [(dir1 + i) % 4 for i in range(4)]
-        b = bonds
-        for d in directions1:
-            if b > atom1.bonds["free"][d]:
-                b -= atom1.bonds["free"][d]
-                atom1.bonds["free"][d] = 0
-            else:
-                atom1.bonds["free"][d] -= b
-                break
-
-        # And Second
-        directions2 = [(dir2 + i) % 4 for i in range(4)]
-        b = bonds
-        for d in directions2:
-            if b > atom2.bonds["free"][d]:
-                b -= atom2.bonds["free"][d]
-                atom2.bonds["free"][d] = 0
-            else:
-                atom2.bonds["free"][d] -= b
-                break
+        index1 = pos1[1] * self.dim[0] + pos1[0]
+        index2 = pos2[1] * self.dim[0] + pos2[0]
+        atom1 = self.own_atom(index1)
+        atom2 = self.own_atom(index2)
+        self.update_statistics(atom1, -1)
+        self.update_statistics(atom2, -1)
+        atom1.bind(dir1, bonds)
+        atom2.bind(dir2, bonds)
+        self.update_statistics(atom1)
+        self.update_statistics(atom2)
+        self.adjacency[index1].update({index2: bonds})
+        self.adjacency[index2].update({index1: bonds})
+        self.invalidate()
 
         return bool(bonds)
 
+    def get_masks(self):
+        """
+        Gets the (cached) occupancy bitmasks of this molecule. There is one int for each row with bit x set if there is
+        an atom at position (x, y).
+        :return: Tuple of row bitmasks.
+        """
+        if self._masks is None:
+            w, h = self.dim
+            masks = []
+            for y in range(h):
+                mask = 0
+                for x, atom in enumerate(self.data[y * w:(y + 1) * w]):
+                    if atom:
+                        mask |= 1 << x
+                masks.append(mask)
+            self._masks = tuple(masks)
+
+        return self._masks
+
+    def get_bottoms(self):
+        """
+        Gets the (cached) bottom profile of this molecule. There is one int for each column with the lowest row of an
+        atom in this column, or None if the column is empty.
+        :return: Tuple of rows.
+        """
+        if self._bottoms is None:
+            bottoms = [None] * self.dim[0]
+            for y, mask in enumerate(self.get_masks()):
+                while mask:
+                    x = (mask & -mask).bit_length() - 1
+                    if bottoms[x] is None:
+                        bottoms[x] = y
+                    mask &= mask - 1
+            self._bottoms = tuple(bottoms)
+
+        return self._bottoms
+
     def collides_with(self, other, pos):
         """
         Tests if this CMolecule collides with the atoms of another CMolecule.
@@ -234,18 +489,20 @@ class CMolecule:
         :return: True if collision, otherwise False
         """
 
-        # Step 1: Calculate overlap area
-        x_overlap = set(range(self.dim[0])) & set(range(pos[0], pos[0] + other.dim[0]))
-        y_overlap = set(range(self.dim[1])) & set(range(pos[1], pos[1] + other.dim[1]))
+        # Step 1: Bounding boxes must overlap
+        ox, oy = pos
+        w, h = self.dim
+        ow, oh = other.dim
+        if (ox >= w) or (ox + ow <= 0) or (oy >= h) or (oy + oh <= 0):
+            return False
 
-        # Step 2: Stepwise check if atoms in both objects
-        for y in y_overlap:
-            for x in x_overlap:
-                xo = x - pos[0]
-                yo = y - pos[1]
-                if self.data[y][x] and other.data[yo][xo]:
-                    pass
-                    return True
+        # Step 2: Test the shifted row masks of the overlapping rows
+        masks = self.get_masks()
+        o_masks = other.get_masks()
+        for y in range(max(0, oy), min(h, oy + oh)):
+            o_mask = o_masks[y - oy]
+            if masks[y] & (o_mask << ox if ox >= 0 else o_mask >> -ox):
+                return True
 
         return False
 
@@ -261,13 +518,71 @@ class CMolecule:
         if self.collides_with(other, pos):
             return False
 
-        # Step 2: Touch means collision after moving
-        for direction in range(4):
-            dx, dy = CAtom.move(direction)
-            if self.collides_with(other,(pos[0] + dx, pos[1] + dy)):
-                return True
+        # Step 2: Touch means atoms next to atoms of the other molecule
+        return bool(self.get_contact_masks(other, pos))
 
-        return False
+    def get_contact_masks(self, other, pos):
+        """
+        Gets the atoms of this CMolecule which are direct neighbors of atoms of another CMolecule.
+        :param other: Other CMolecule object.
+        :param pos: Relative position of the other CMolecule object.
+        :return: Dict with a bitmask of the neighbor atoms (bit x set for position (x, y)) for each row y with contact.
+        """
+
+        # Step 1: Bounding boxes must touch at least
+        ox, oy = pos
+        w, h = self.dim
+        ow, oh = other.dim
+        if (ox > w) or (ox + ow < 0) or (oy > h) or (oy + oh < 0):
+            return {}
+
+        # Step 2: Contact means collision with the other molecule grown by one step in each direction. The grown masks
+        # are shifted by one more bit to keep the column left of the other molecule.
+        masks = self.get_masks()
+        o_masks = other.get_masks()
+        shift = ox - 1
+        contacts = {}
+        for y in range(max(0, oy - 1), min(h, oy + oh + 1)):
+            r = y - oy
+            o_mask = o_masks[r] if 0 <= r < oh else 0
+            grown = (o_mask << 2) | o_mask
+            if 0 <= r - 1 < oh:
+                grown |= o_masks[r - 1] << 1
+            if 0 <= r + 1 < oh:
+                grown |= o_masks[r + 1] << 1
+            contact = masks[y] & (grown << shift if shift >= 0 else grown >> -shift)
+            if contact:
+                contacts.update({y: contact})
+
+        return contacts
+
+    def find_seam(self, other, pos):
+        """
+        Finds all pairs of neighbor atoms at the contact boundary (seam) of this CMolecule and another CMolecule.
+        :param other: Other CMolecule object.
+        :param pos: Relative position of the other CMolecule object.
+        :return: List of position pairs (pos1, pos2) in coordinates of this CMolecule with pos2 either right of or
+        below pos1 (next column or next row). Ordered by pos1 row, pos1 column, and horizontal before vertical.
+        """
+        ox, oy = pos
+        ow, oh = other.dim
+        pairs = []
+        for y, contact in self.get_contact_masks(other, pos).items():
+            x = 0
+            while contact:
+                if contact & 1:
+                    for direction in range(4):
+                        dx, dy = CAtom.move(direction)
+                        xo = x + dx - ox
+                        yo = y + dy - oy
+                        if (0 <= xo < ow) and (0 <= yo < oh) and other.get_atom((xo, yo)):
+                            pos1, pos2 = (x, y), (x + dx, y + dy)
+                            pairs.append((pos1, pos2) if dx + dy > 0 else (pos2, pos1))
+                contact >>= 1
+                x += 1
+
+        pairs.sort(key=lambda pair: (pair[0][1], pair[0][0], pair[1][1] - pair[0][1]))
+        return pairs
 
     def add(self, other, pos, overwrite=False):
         """
@@ -288,32 +603,57 @@ class CMolecule:
         nw = max(w, ox + ow) - nx
         nh = max(h, oy + oh) - ny
 
-        # Step 3: Create new data array
-        n_data = [[None for __ in range(nw)] for _ in range(nh)]
+        # Step 3: Create new data buffer
+        n_data = [None] * (nw * nh)
 
-        # Step 4: Move self data
+        # Step 4: Move self data (row slices)
         for y in range(h):
-            for x in range(w):
-                atom = self.get_atom((x, y))
-                n_data[y - ny][x - nx] = atom.copy() if atom else None
+            start = (y - ny) * nw - nx
+            n_data[start:start + w] = self.data[y * w:(y + 1) * w]
 
-        # Step 5: Copy other data
+        self.remap_adjacency(lambda i: (i // w - ny) * nw + i % w - nx)
+
+        # Step 5: Copy other data. The atoms are shared with other until changed.
+        copied = set()
         for y in range(oh):
+            start = (y + oy - ny) * nw + ox - nx
+            row = other.data[y * ow:(y + 1) * ow]
             for x in range(ow):
-                if (not n_data[y + oy - ny][x + ox - nx]) or overwrite:
-                    atom = other.data[y][x]
-                    n_data[y + oy - ny][x + ox - nx] = atom.copy() if atom else None
+                if (not n_data[start + x]) or overwrite:
+                    atom = row[x]
+                    if n_data[start + x]:
+                        self.update_statistics(n_data[start + x], -1)
+                        self._owned.discard(n_data[start + x])
+                        for j in self.adjacency.pop(start + x):
+                            del self.adjacency[j][start + x]
+                    if atom:
+                        self.update_statistics(atom)
+                        copied.add(y * ow + x)
+                    n_data[start + x] = atom
+
+        # Other doesn't own the shared atoms anymore: Both molecules copy them before changing them in place
+        other._owned.difference_update(other.data[i] for i in copied)
 
-        # Step 6: Link data
+        # Step 6: Copy the bonds between the copied atoms of other
+        for i in copied:
+            self.adjacency.update({(i // ow + oy - ny) * nw + i % ow + ox - nx:
+                                   {(j // ow + oy - ny) * nw + j % ow + ox - nx: bond
+                                    for j, bond in other.adjacency[i].items() if j in copied}})
+
+        # Step 7: Link data
         self.dim = (nw, nh)
         self.data = n_data
+        self._shared = False
+        self.invalidate()
 
     
-    def connect(self, other, pos):
+    def connect(self, other, pos, seam_only=True):
         """
         Connects this CMolecule with another CMolecule. Remains this molecule unchanged if there is no connection possible.
         :param other: Other CMolecule object.
         :param pos: Relative position of the other CMolecule object.
+        :param seam_only: If True (default), only try to connect atoms at the contact boundary of both molecules.
+        Otherwise, try to connect all unconnected neighbor atoms of the merged molecule.
         :return: True, if connection built. Otherwise, False.
         """
 
@@ -323,30 +663,66 @@ class CMolecule:
         if not self.touches(other, pos):
             return False
 
-        # Step 2: Merge data
-        new_cm = self.copy()
-        new_cm.add(other, pos)
+        if seam_only:
+            # Step 2: Find seam atom pairs with free electrons on both sides. Stop if there are none. Otherwise, at
+            # least the first pair will connect.
+            w, h = self.dim
+            ox, oy = pos
 
-        # Step 3: Find possible connection points
-        w, h = new_cm.dim
-        for y in range(h):
-            for x in range(w):
-                atom = new_cm.get_atom((x, y))
-                if atom:
-                    for direction in range(1,3):    # Need only 2 directions to check
-                        dx, dy = CAtom.move(direction)
-                        nx = x + dx
-                        ny = y + dy
-                        if (nx >= 0) and (nx < w) and (ny >= 0) and (ny < h):
-                            neighbor = new_cm.get_atom((nx, ny))
-                            if neighbor:
-                                if not new_cm.is_connected((x, y), (nx, ny)):
-                                    connected |= new_cm.connect_atoms((x, y), (nx, ny), nr=3, pedantic=False)
+            def get_atom_at(position):
+                x, y = position
+                if (0 <= x < w) and (0 <= y < h) and self.get_atom(position):
+                    return self.get_atom(position)
+                return other.get_atom((x - ox, y - oy))
+
+            seam = [(pos1, pos2) for pos1, pos2 in self.find_seam(other, pos)
+                    if get_atom_at(pos1).count_free() and get_atom_at(pos2).count_free()]
+            if not seam:
+                return False
+
+            # Step 3: Merge data and connect along the seam
+            new_cm = self.copy()
+            new_cm.add(other, pos)
+            nx = -min(0, ox)
+            ny = -min(0, oy)
+            for (x1, y1), (x2, y2) in seam:
+                n_pos1 = (x1 + nx, y1 + ny)
+                n_pos2 = (x2 + nx, y2 + ny)
+                if not new_cm.is_connected(n_pos1, n_pos2):
+                    connected |= new_cm.connect_atoms(n_pos1, n_pos2, nr=3, pedantic=False)
+
+        else:
+            # Step 2: Merge data
+            new_cm = self.copy()
+            new_cm.add(other, pos)
+
+            # Step 3: Find possible connection points
+            w, h = new_cm.dim
+            for y in range(h):
+                for x in range(w):
+                    atom = new_cm.get_atom((x, y))
+                    if atom:
+                        for direction in range(1,3):    # Need only 2 directions to check
+                            dx, dy = CAtom.move(direction)
+                            nx = x + dx
+                            ny = y + dy
+                            if (nx >= 0) and (nx < w) and (ny >= 0) and (ny < h):
+                                neighbor = new_cm.get_atom((nx, ny))
+                                if neighbor:
+                                    if not new_cm.is_connected((x, y), (nx, ny)):
+                                        connected |= new_cm.connect_atoms((x, y), (nx, ny), nr=3, pedantic=False)
 
         # Step 4: Apply changes if connected
         if connected:
             self.dim = new_cm.dim
             self.data = new_cm.data
+            self.adjacency = new_cm.adjacency
+            self._shared = new_cm._shared
+            self._owned = new_cm._owned
+            self._atom_counts = new_cm._atom_counts
+            self._bound_counts = new_cm._bound_counts
+            self._free_count = new_cm._free_count
+            self.invalidate()
 
         return connected
 
@@ -356,27 +732,31 @@ class CMolecule:
         Clockwise rotation of the molecule.
         :param nr: number of rotations.
         """
-        for _ in range(nr):
-            # Step 1: Create a new data block with rotated dimensions
-            n_data = [[None for ___ in range(self.dim[1])] for __ in range(self.dim[0])]
+        nr %= 4
+        if nr == 0:
+            return
 
-            # Step 2: Copy data and rotate bonds
-            w, h = self.dim
-            for y in range(h):
-                for x in range(w):
-
-                    # Copy atoms
-                    n_data[x][h - y - 1] = self.get_atom((x, y))
-
-                    # Rotate bonds
-                    atom: None | CAtom = n_data[x][h - y - 1]
-                    if atom:
-                        for key in atom.bonds.keys():
-                            atom.bonds.update({key: atom.bonds[key][-1:] + atom.bonds[key][:-1]})
-
-            # Step 3: Apply rotated data
-            self.data = n_data
+        # Step 1: Permute cells. Each new row is a column of the old data.
+        w, h = self.dim
+        data = self.data
+        if nr == 1:
+            self.data = [atom for x in range(w) for atom in data[x::w][::-1]]
+            self.dim = (h, w)
+            self.remap_adjacency(lambda i: (i % w) * h + h - 1 - i // w)
+        elif nr == 2:
+            self.data = data[::-1]
+            self.remap_adjacency(lambda i: w * h - 1 - i)
+        else:
+            self.data = [atom for x in range(w - 1, -1, -1) for atom in data[x::w]]
             self.dim = (h, w)
+            self.remap_adjacency(lambda i: (w - 1 - i % w) * h + i // w)
+        self._shared = False
+        self.invalidate()
+
+        # Step 2: Rotate bonds
+        for i, atom in enumerate(self.data):
+            if atom:
+                self.own_atom(i).rotate(nr)
 
 
     def h_flip(self):
@@ -384,35 +764,35 @@ class CMolecule:
         Flips molecule data (atoms and bonds) horizontally.
         """
 
-        for y in range(len(self.data)):
-            # Step 1: Flip line
-            self.data[y].reverse()
+        # Step 1: Flip lines
+        w, h = self.dim
+        data = self.data
+        self.data = [atom for y in range(h) for atom in data[y * w:(y + 1) * w][::-1]]
+        self.remap_adjacency(lambda i: i + w - 1 - 2 * (i % w))
+        self._shared = False
+        self.invalidate()
 
-            # Step 2: Flip bonds
-            for x in range(len(self.data[y])):
-                atom = self.get_atom((x, y))
-                if atom:
-                    for bonds in atom.bonds.values():
-                        h = bonds[1]
-                        bonds[1] = bonds[3]
-                        bonds[3] = h
+        # Step 2: Flip bonds
+        for i, atom in enumerate(self.data):
+            if atom:
+                self.own_atom(i).h_flip()
 
     def v_flip(self):
         """
         Flips molecule data (atoms and bonds) vertically.
         """
-        # Step 1: Flip all
-        self.data.reverse()
+        # Step 1: Flip all lines
+        w, h = self.dim
+        data = self.data
+        self.data = [atom for y in range(h - 1, -1, -1) for atom in data[y * w:(y + 1) * w]]
+        self.remap_adjacency(lambda i: (h - 1 - i // w) * w + i % w)
+        self._shared = False
+        self.invalidate()
 
         # Step 2: Flip bonds
-        for y in range(len(self.data)):
-            for x in range(len(self.data[y])):
-                atom = self.get_atom((x, y))
-                if atom:
-                    for bonds in atom.bonds.values():
-                        h = bonds[0]
-                        bonds[0] = bonds[2]
-                        bonds[2] = h
+        for i, atom in enumerate(self.data):
+            if atom:
+                self.own_atom(i).v_flip()
 
     def flip(self, orientation="horizontal"):
         """
@@ -429,33 +809,154 @@ class CMolecule:
         else:
             ValueError("Invalid value for orientation (either 'horizontal' or 'vertical').")
 
+    def create_orientations(self):
+        """
+        Precomputes all orientations (4 rotations, each also horizontally flipped) of this molecule as templates. Use
+        get_orientation() to get copies. The copies share the templates, so that get_rotated() and get_h_flipped() also
+        take their results from the templates until a copy is changed (except by electron delocalization).
+        """
+        base = self.copy()
+        self._orientations = {(0, 0): base}
+        self._orientation = (0, 0)
+        base._orientations = self._orientations
+        base._orientation = (0, 0)
+        for orientation in range(1, self.ORIENTATIONS):
+            self.get_orientation(orientation)
+
+    def get_orientation(self, orientation, phase=0):
+        """
+        Gets a copy of a precomputed orientation of this molecule. Requires create_orientations() before. Templates for
+        orientations with a phase of electron delocalization are created on demand.
+        :param orientation: Orientation index: Number of clockwise rotations 0..3, plus 4 if horizontally flipped after
+        rotation.
+        :param phase: Number of electron delocalization steps after rotation and flip.
+        :return: Copied CMolecule.
+        """
+        key = (orientation % self.ORIENTATIONS, phase % self.PHASES)
+        template = self._orientations.get(key)
+        if template is None:
+            template = self._orientations[(0, 0)].copy()
+            template.rotate(key[0] % 4)
+            if key[0] >= 4:
+                template.h_flip()
+            template._orientations = None
+            for _ in range(key[1]):
+                template.delocalize_free_bonds()
+            template._orientations = self._orientations
+            template._orientation = key
+            self._orientations.update({key: template})
+
+        return template.copy()
+
+    def get_rotated(self, nr=1):
+        """
+        Gets a clockwise rotated copy of this molecule. Uses the precomputed orientations, if available.
+        :param nr: number of rotations.
+        :return: Rotated CMolecule.
+        """
+        if self._orientations is None:
+            molecule = self.copy()
+            molecule.rotate(nr)
+            return molecule
+
+        # Rotation and delocalization commute
+        return self.get_orientation(self.get_rotated_orientation(nr), self._orientation[1])
+
+    def get_orientation_index(self):
+        """
+        Gets the orientation index of this molecule with respect to its precomputed orientations.
+        :return: Orientation index 0..7 (see get_orientation()) or None, if no orientations are precomputed.
+        """
+        return None if self._orientations is None else self._orientation[0]
+
+    def get_orientation_phase(self):
+        """
+        Gets the number of electron delocalization steps of this molecule with respect to its precomputed orientations.
+        :return: Phase 0..11 (see get_orientation()) or None, if no orientations are precomputed.
+        """
+        return None if self._orientations is None else self._orientation[1]
+
+    def shares_orientations(self, other):
+        """
+        Tests if this molecule and another molecule are orientations of the same precomputed molecule.
+        :param other: Other CMolecule object.
+        :return: True, if both share the precomputed orientations. Otherwise, False.
+        """
+        return (self._orientations is not None) and (self._orientations is other._orientations)
+
+    def get_rotated_orientation(self, nr=1):
+        """
+        Gets the orientation index of a clockwise rotated copy of this molecule without creating it. Requires
+        precomputed orientations.
+        :param nr: number of rotations.
+        :return: Orientation index 0..7.
+        """
+
+        # Rotation after a flip equals a flip after a counterclockwise rotation
+        orientation = self._orientation[0]
+        flipped = orientation >= 4
+        rotations = (orientation - nr) % 4 if flipped else (orientation + nr) % 4
+        return 4 * flipped + rotations
+
+    def get_orientation_masks(self, orientation):
+        """
+        Gets the dimension and the occupancy bitmasks (see get_masks()) of a precomputed orientation without copying
+        it. Requires precomputed orientations. Electron delocalization doesn't change the masks.
+        :param orientation: Orientation index 0..7.
+        :return: Tuple of (i) dimension and (ii) tuple of row bitmasks.
+        """
+        template = self._orientations.get((orientation % self.ORIENTATIONS, 0))
+        if template is None:
+            template = self.get_orientation(orientation)
+        return template.dim, template.get_masks()
+
+    def get_h_flipped(self):
+        """
+        Gets a horizontally flipped copy of this molecule. Uses the precomputed orientations, if available.
+        :return: Flipped CMolecule.
+        """
+        if self._orientations is None:
+            molecule = self.copy()
+            molecule.h_flip()
+            return molecule
+
+        # Flip inverts the direction of electron delocalization
+        orientation, phase = self._orientation
+        return self.get_orientation((orientation + 4) % self.ORIENTATIONS, -phase)
+
     def get_atom_positions(self):
         """
         Gets a list of positions for all atoms in the molecule.
         :return: List of position tuples.
         """
-        return [(x,y) for x in range(self.dim[0]) for y in range(self.dim[1]) if self.get_atom((x, y))]
+        w = self.dim[0]
+        return sorted((i % w, i // w) for i in self.adjacency)
 
     def has_free_bonds(self):
         """
         Checks if a non-empty molecule has got free bonds.
         :return: True, if there are free bonds. Otherwise, False. Also, False for empty molecules.
         """
-        for line in self.data:
-            for atom in line:
-                if atom and (sum(atom.bonds["free"]) > 0):
-                    return True
-
-        return False
+        return self._free_count > 0
 
-    def delocalize_free_bonds(self):
+    def delocalize_free_bonds(self, states: dict[int, int] | None = None):
         """
         Moves all free bonds for the respective atom for all atoms. This simulates electron delocalization.
+        :param states: Optional, precomputed packed states after delocalization by flat cell index, e.g. by CAtomTable.
+        Only contains the changed atoms.
         """
-        for line in self.data:
-            for atom in line:
+        if states is None:
+            for i, atom in enumerate(self.data):
                 if atom:
-                    atom.delocalize_free()
+                    self.own_atom(i).delocalize_free()
+        else:
+            for i, state in states.items():
+                self.own_atom(i).state = state
+
+        # Delocalization doesn't invalidate cached orientations, keep track of the phase instead
+        if self._orientations is not None:
+            orientation, phase = self._orientation
+            self._orientation = (orientation, (phase + 1) % self.PHASES)
 
     def count_atoms(self, symbol):
         """
@@ -463,28 +964,40 @@ class CMolecule:
         :param symbol: CAtom symbol.
         :return: Number of matching atoms.
         """
-        nr = 0
-        for line in self.data:
-            for atom in line:
-                if atom and (not symbol or (atom.symbol == symbol)):
-                    nr += 1
+        if not symbol:
+            return sum(self._atom_counts.values())
 
-        return nr
+        return self._atom_counts.get(symbol, 0)
 
     def count_bonds(self, bond):
         """
         Counts the number of single (bond=1), double (bond=2), or tiple bonds (bond=3).
-        :param bond: Number representing the bond type 1..3.
+        :param bond: Number representing the bond type 1..3. Or None for the total number of bonds.
         :return: Number of single, double, or triple bonds.
         """
-        nr = 0
-        for line in self.data:
-            for atom in line:
-                if atom:
-                    bonds = sum(atom.bonds["bound"]) if bond is None else atom.bonds["bound"].count(bond)
-                    nr += bonds
+        if bond is None:
+            return sum(b * nr for b, nr in enumerate(self._bound_counts)) / 2
 
-        return nr / 2
+        return self._bound_counts[bond] / 2
+
+    def count_free(self):
+        """
+        Counts the number of free electrons of all atoms.
+        :return: Number of free electrons.
+        """
+        return self._free_count
+
+    def get_formula(self):
+        """
+        Gets the molecular formula in Hill notation: C first, H second, and then all other symbols alphabetically. Or
+        all symbols alphabetically if there is no C.
+        :return: Molecular formula string (e.g., "CH2O").
+        """
+        symbols = sorted(self._atom_counts)
+        if "C" in self._atom_counts:
+            symbols = ["C"] + (["H"] if "H" in self._atom_counts else []) + [s for s in symbols if s not in ("C", "H")]
+
+        return "".join(s + (str(self._atom_counts[s]) if self._atom_counts[s] > 1 else "") for s in symbols)
 
     def find_end_positions(self):
         """
@@ -492,124 +1005,133 @@ class CMolecule:
         there is none, then all positions for atoms connected to two other atoms.
         :return: List of atom coordinates as tuples (x, y).
         """
-        end_positions = []
+        w = self.dim[0]
         for connections in range(1, 3):
-            for row in range(self.dim[1]):
-                for col in range(self.dim[0]):
-                    atom = self.get_atom((col, row))
-                    if atom and (atom.count_connected() == connections):
-                        end_positions.append((col, row))
-
+            end_positions = [(i % w, i // w) for i in sorted(self.adjacency) if len(self.adjacency[i]) == connections]
             if end_positions:
                 return end_positions
 
         return []
 
 
-    def equals(self, other):
+    def get_bond_graph(self):
+        """
+        Gets the bond graph of this molecule.
+        :return: Tuple of (i) a list of atom positions, (ii) a list of the respective atom symbols, and (iii) an
+        adjacency list with a list of (neighbor index, bond type) tuples for each atom.
+        """
+        w = self.dim[0]
+        cells = sorted(self.adjacency)
+        indices = {cell: i for i, cell in enumerate(cells)}
+        positions = [(cell % w, cell // w) for cell in cells]
+        symbols = [self.data[cell].symbol for cell in cells]
+        adjacency = [[(indices[j], bond) for j, bond in self.adjacency[cell].items()] for cell in cells]
+        return positions, symbols, adjacency
+
+    def get_canonical_form(self):
+        """
+        Gets the canonical form of the bond graph of this molecule. The canonical form only depends on the atom symbols
+        and the bonds. It is independent of position, rotation, and flips. Two molecules represent the same chemical
+        molecule if they have got the same canonical form. The result is cached until the molecule changes.
+        :return: Canonical form string.
+        """
+
+        def __refine__(colors, adjacency):
+            # Split color classes by the colors of the bound neighbors until stable
+            while True:
+                keys = [(colors[i], tuple(sorted((bond, colors[j]) for j, bond in adjacency[i])))
+                        for i in range(len(colors))]
+                ranks = {key: rank for rank, key in enumerate(sorted(set(keys)))}
+                n_colors = [ranks[key] for key in keys]
+                if len(ranks) == len(set(colors)):
+                    return n_colors
+                colors = n_colors
+
+        def __search__(colors, symbols, adjacency, best):
+            colors = __refine__(colors, adjacency)
+            n = len(colors)
+
+            # Discrete coloring: Colors are the canonical atom indices
+            if len(set(colors)) == n:
+                n_symbols = [""] * n
+                for i in range(n):
+                    n_symbols[colors[i]] = symbols[i]
+                bonds = sorted((min(colors[i], colors[j]), max(colors[i], colors[j]), bond)
+                               for i in range(n) for j, bond in adjacency[i] if i < j)
+                certificate = (n_symbols, bonds)
+                return certificate if (best is None) or (certificate < best) else best
+
+            # Otherwise, individualize each atom of the first non-singleton color class. Skip twins (atoms with the
+            # same bonds to the same neighbors) as they lead to the same result.
+            color = min(c for c in set(colors) if colors.count(c) > 1)
+            tried = []
+            for i in range(n):
+                if colors[i] == color:
+                    neighbors = sorted(adjacency[i])
+                    if neighbors not in tried:
+                        tried.append(neighbors)
+                        best = __search__([2 * c if j == i else 2 * c + 1 for j, c in enumerate(colors)],
+                                          symbols, adjacency, best)
+
+            return best
+
+        if self._canonical is None:
+            __, symbols, adjacency = self.get_bond_graph()
+
+            # Split into connected parts
+            parts = []
+            part_ids = [-1] * len(symbols)
+            for first in range(len(symbols)):
+                if part_ids[first] < 0:
+                    part = [first]
+                    part_ids[first] = len(parts)
+                    for i in part:
+                        for j, __ in adjacency[i]:
+                            if part_ids[j] < 0:
+                                part_ids[j] = len(parts)
+                                part.append(j)
+                    parts.append(part)
+
+            # Canonical form for each part
+            forms = []
+            for part in parts:
+                local = {i: k for k, i in enumerate(part)}
+                p_symbols = [symbols[i] for i in part]
+                p_adjacency = [[(local[j], bond) for j, bond in adjacency[i]] for i in part]
+                ranks = {symbol: rank for rank, symbol in enumerate(sorted(set(p_symbols)))}
+                n_symbols, bonds = __search__([ranks[symbol] for symbol in p_symbols], p_symbols, p_adjacency, None)
+                forms.append(",".join(n_symbols) + ";" +
+                             ",".join(str(i) + "-" + str(j) + ":" + str(bond) for i, j, bond in bonds))
+
+            self._canonical = ".".join(sorted(forms))
+
+        return self._canonical
+
+    def get_canonical_hash(self):
+        """
+        Gets a hash of the canonical form of this molecule.
+        :return: Hash value.
+        """
+        return hash(self.get_canonical_form())
+
+    def equals(self, other, verify=True):
         """
         Compares two CMolecules if they represent the same chemical molecule ignoring limitations of stereo-chemistry
         and rotational limitations (e.g, double bonds).
         :param other: Other CMolecule.
+        :param verify: If True (default), also compare the canonical forms. Otherwise, only compare their hashes.
         :return: True if both molecule match, otherwise False.
         """
 
-        def __compare_recursive__(pos1, pos2, mol1, mol2):
-
-            # Copy act atoms
-            atom1 = mol1.get_atom(pos1).copy()
-            atom2 = mol2.get_atom(pos2).copy()
-
-            # Check equal atoms
-            if not atom1.equals(atom2):
-                return False
-
-            # Prepare to continue with neighbors
-            bond_directions1 = [i for i in range(4) if atom1.bonds["bound"][i]]
-            bond_directions2 = [i for i in range(4) if atom2.bonds["bound"][i]]
-
-            # Copy molecules and remove atom from act pos
-            n_mol1 = mol1.copy()
-            n_mol1.set_atom(pos1, None)
-            n_mol2 = mol2.copy()
-            n_mol2.set_atom(pos2, None)
-
-            for direction1 in bond_directions1:
-                d_pos1 = CAtom.move(direction1)
-                n_pos1 = (pos1[0] + d_pos1[0], pos1[1] + d_pos1[1])
-                n_atom1 = mol1.get_atom(n_pos1)
-                match = False
-
-                if not bond_directions2:
-                    return False
-
-                for direction2 in bond_directions2:
-                    d_pos2 = CAtom.move(direction2)
-                    n_pos2 = (pos2[0] + d_pos2[0], pos2[1] + d_pos2[1])
-                    n_atom2 = mol2.get_atom(n_pos2)
-
-                    # Check both for None (both end in an atom checked before) -> True
-                    if (n_atom1 is None) and (n_atom2 is None):
-                        match = True
-
-                    # Equal atoms -> recursive call
-                    elif (n_atom1 is not None) and (n_atom2 is not None):
-                        match = __compare_recursive__(n_pos1, n_pos2, n_mol1, n_mol2)
-
-                    # Prevent checking the same branch twice
-                    if match:
-                        bond_directions2.remove(direction2)
-                        break
-
-                # All neighbors1 must return True
-                if not match:
-                    return False
-
-            return True
-
-        # Step 1: Compare statistics: Total number of atoms
-        if self.count_atoms(None) != other.count_atoms(None):
+        # Step 1: Compare statistics
+        if (self._atom_counts != other._atom_counts) or (self._bound_counts != other._bound_counts):
             return False
 
-        # Step 2: Compare statistics: Number of atoms for each symbol
-        symbols = set([atom.symbol for line in self.data for atom in line if atom])
-        for symbol in symbols:
-            if self.count_atoms(symbol) != other.count_atoms(symbol):
-                return False
-
-        # Step 3: Compare statistics: Total number of bonds
-        bonds1 = self.count_bonds(None)
-        bonds2 = other.count_bonds(None)
-        if bonds1 != bonds2:
+        # Step 2: Compare canonical forms
+        if self.get_canonical_hash() != other.get_canonical_hash():
             return False
 
-        # Step 4: Compare statistics: Special case: equal single atom molecules
-        if (bonds1 == 0) and (bonds2 == 0):
-            return True
-
-        # Step 5: Compare statistics: Number of bonds for each type
-        for bond in range(1, 4):
-            if self.count_bonds(bond) != other.count_bonds(bond):
-                return False
-
-        # Step 6: Find first end in self
-        end1 = self.find_end_positions()[0] # Safe to skip check against [] as single atom molecules were excluded before
-        atom1 = self.data[end1[1]][end1[0]]
-
-        # Step 7: Find all ends with the same atom in other
-        ends2 = []
-        for y in range(other.dim[1]):
-            for x in range(other.dim[0]):
-                atom = other.get_atom((x, y))
-                if atom and atom.equals(atom1):
-                    ends2.append((x,y))
-
-        # Step 8: Recursively compare for all possible ends of other until the first match
-        for end2 in ends2:
-            if __compare_recursive__(end1, end2, self, other):
-                return True
-
-        return False
+        return (not verify) or (self.get_canonical_form() == other.get_canonical_form())
 
     def copy(self):
         """
@@ -619,21 +1141,25 @@ class CMolecule:
         return self.__copy__()
 
     def __copy__(self):
-        m = CMolecule(self.name, self.dim)
-        m.data = [[self.get_atom((x, y)).copy() if self.get_atom((x, y)) else None for x in range(self.dim[0])] for y in range(self.dim[1])]
+        # Share data, adjacency, and atoms (copy-on-write). Atoms owned by this object become shared, too.
+        m = CMolecule(self.name)
+        m.dim = self.dim
+        m.data = self.data
+        m.adjacency = self.adjacency
+        m._shared = self._shared = True
+        self._owned = set()
+        m._masks = self._masks
+        m._bottoms = self._bottoms
+        m._canonical = self._canonical
+        m._atom_counts = self._atom_counts.copy()
+        m._bound_counts = self._bound_counts.copy()
+        m._free_count = self._free_count
+        m._orientations = self._orientations
+        m._orientation = self._orientation
         return m
 
     def __str__(self):
-        # TODO Bonds
-        txt = ""
-        for l in range(len(self.data)):
-            line = self.data[l]
-            for symbol in line:
-                txt += symbol.symbol if symbol else " "
-            if l < len(self.data) - 1:
-                txt += "\n"
-
-        return txt
+        return "\n".join(self.to_text())
 
     def __bool__(self):
         return self.dim != (0, 0)
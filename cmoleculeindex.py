@@ -0,0 +1,153 @@
+from hashlib import blake2b
+from json import load as load_json
+from mmap import mmap, ACCESS_READ
+from os import replace
+from os.path import getmtime, isfile
+from struct import Struct
+
+from catom import CAtom
+from cmolecule import CMolecule
+
+
+class CMoleculeIndex:
+    """
+    CMoleculeIndex names molecules. Molecules are looked up by their canonical form. Single molecules (e.g., the bonus
+    molecules) are held in memory. Molecule lists are stored in an index file (a hash table of canonical form digests)
+    which is built once and memory-mapped.
+    """
+
+    MAGIC = b"CHONIDX1"
+    HEADER = Struct("<8sII")
+    """
+    Index file header: Magic, number of slots (power of 2), and number of entries.
+    """
+    SLOT = Struct("<16sII")
+    """
+    Index file slot: Digest of the canonical form, offset and length of the name in the names block.
+    """
+    EMPTY = bytes(16)
+
+    def __init__(self, atoms: dict[str, None | CAtom]):
+        """
+        Creates an empty molecule index.
+        :param atoms: Dict containing the atoms.
+        """
+        self.atoms = atoms
+        self.names: dict[str, str] = {}
+        self._mapped: list[mmap] = []
+
+    @classmethod
+    def digest(cls, form: str):
+        """
+        Calculates the digest of a canonical form as used as key in index files.
+        :param form: Canonical form string.
+        :return: 16 bytes digest.
+        """
+        return blake2b(form.encode("utf8"), digest_size=16).digest()
+
+    def add(self, name: str, molecule: CMolecule):
+        """
+        Adds a molecule to the in-memory index. Molecules which are already indexed keep their name.
+        :param name: Molecule name.
+        :param molecule: CMolecule.
+        """
+        self.names.setdefault(molecule.get_canonical_form(), name)
+
+    def build_mapped(self, filename, index_filename):
+        """
+        Builds an index file from a json molecule list.
+        :param filename: (Path and) Filename of the json file (same format as <DATA_PATH>/bonus.json).
+        :param index_filename: (Path and) Filename of the index file to create.
+        """
+
+        # Step 1: Digests and names
+        entries = {}
+        with open(filename, "r", encoding="utf8") as read_file:
+            for m in load_json(read_file):
+                molecule = CMolecule(name=m["name"], atoms=self.atoms, txt=m["data"])
+                entries.setdefault(self.digest(molecule.get_canonical_form()), m["name"])
+
+        # Step 2: Hash table with a load factor <= 0.5 and linear probing
+        slots = 1
+        while slots < 2 * len(entries):
+            slots *= 2
+        table = [(self.EMPTY, 0, 0)] * slots
+        names = bytearray()
+        for key, name in entries.items():
+            encoded = name.encode("utf8")
+            slot = int.from_bytes(key[:8], "little") & (slots - 1)
+            while table[slot][0] != self.EMPTY:
+                slot = (slot + 1) & (slots - 1)
+            table[slot] = (key, len(names), len(encoded))
+            names += encoded
+
+        # Step 3: Write to a temporary file and replace the index file
+        with open(index_filename + ".tmp", "wb") as write_file:
+            write_file.write(self.HEADER.pack(self.MAGIC, slots, len(entries)))
+            for slot in table:
+                write_file.write(self.SLOT.pack(*slot))
+            write_file.write(names)
+        replace(index_filename + ".tmp", index_filename)
+
+    def load_mapped(self, filename, index_filename):
+        """
+        Memory-maps an index file for a json molecule list. (Re-)builds the index file first, if it doesn't exist or if
+        it is older than the json file.
+        :param filename: (Path and) Filename of the json file (same format as <DATA_PATH>/bonus.json).
+        :param index_filename: (Path and) Filename of the index file.
+        :raises ValueError: If the index file is invalid.
+        """
+        if (not isfile(index_filename)) or (getmtime(index_filename) < getmtime(filename)):
+            self.build_mapped(filename, index_filename)
+
+        with open(index_filename, "rb") as read_file:
+            mapped = mmap(read_file.fileno(), 0, access=ACCESS_READ)
+
+        # Validate header and hash table size: Slots must be a power of 2, all slots must be in the file
+        valid = len(mapped) >= self.HEADER.size
+        if valid:
+            magic, slots, __ = self.HEADER.unpack_from(mapped, 0)
+            valid = ((magic == self.MAGIC) and (slots > 0) and not (slots & (slots - 1)) and
+                     (len(mapped) >= self.HEADER.size + slots * self.SLOT.size))
+        if not valid:
+            mapped.close()
+            raise ValueError("Invalid molecule index file " + index_filename)
+        self._mapped.append(mapped)
+
+    def get_name(self, molecule: CMolecule):
+        """
+        Gets the name of a molecule.
+        :param molecule: CMolecule.
+        :return: Name of the molecule, or None if not indexed.
+        """
+
+        # Step 1: In-memory index
+        form = molecule.get_canonical_form()
+        if form in self.names:
+            return self.names[form]
+
+        # Step 2: Index files
+        if self._mapped:
+            key = self.digest(form)
+            start = int.from_bytes(key[:8], "little")
+            for mapped in self._mapped:
+                __, slots, __ = self.HEADER.unpack_from(mapped, 0)
+                names_offset = self.HEADER.size + slots * self.SLOT.size
+                slot = start & (slots - 1)
+                while True:
+                    s_key, offset, length = self.SLOT.unpack_from(mapped, self.HEADER.size + slot * self.SLOT.size)
+                    if s_key == self.EMPTY:
+                        break
+                    if s_key == key:
+                        return mapped[names_offset + offset:names_offset + offset + length].decode("utf8")
+                    slot = (slot + 1) & (slots - 1)
+
+        return None
+
+    def close(self):
+        """
+        Closes all memory-mapped index files.
+        """
+        for mapped in self._mapped:
+            mapped.close()
+        self._mapped.clear()
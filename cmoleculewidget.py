@@ -90,7 +90,7 @@ class CMoleculeWidget(Widget):
                         if atom is not None:
                             # Bound: Direction 0 and 1 only
                             for direction in range(2):
-                                nr_bonds = atom.bonds["bound"][direction]
+                                nr_bonds = atom.get_bound(direction)
                                 x = col + 0.5 * (1 - self.BOND - (nr_bonds - 1) * step)
                                 for i in range(nr_bonds):
                                     if direction != 0:
@@ -103,7 +103,7 @@ class CMoleculeWidget(Widget):
 
                             # Free:
                             for direction in range(4):
-                                nr_bonds = atom.bonds["free"][direction]
+                                nr_bonds = atom.get_free(direction)
                                 x = col + 0.5 * (1 - self.BOND - (nr_bonds - 1) * step)
                                 for i in range(nr_bonds):
                                     if direction != 0:
@@ -124,7 +124,7 @@ class CMoleculeWidget(Widget):
                                 atom_image = app.atom_images[atom_filename]
                                 Color(1, 1, 1, 1)
                                 Rectangle(texture=atom_image.texture, pos=(col + 0.15, row + 0.15), size=(0.7, 0.7))
-                                nr_free = sum(atom.bonds["free"])
+                                nr_free = atom.count_free()
                                 if nr_free:
                                     label = Label(text=str(nr_free), font_size=20)
                                     label.refresh()
@@ -183,43 +183,3 @@ class CMoleculeWidget(Widget):
         """
         self.molecule.delocalize_free_bonds()
         self.draw_canvas()
-
-    def collides_with_others(self, others: list, col: int | None = None, row: int | None = None):
-        """
-        Tests if this molecule widget collides with the atoms of other CMoleculeWidgets from a list.
-        :param others: List of other CMoleculeWidgets.
-        :param col: Optional, alternative col for this molecule.
-        :param row: Optional, alternative row for this molecule.
-        :return: True if collision, otherwise False.
-        """
-        col = col if col is not None else self.col
-        row = row if row is not None else self.row
-        for o in others:
-            if type(o) is type(self):
-                rel_pos = (o.col - col, o.row - row)
-                if self.molecule.collides_with(o.molecule, rel_pos):
-                    pass
-                    return True
-
-        return False
-
-    def list_colliders(self, others: list, col: int | None = None, row: int | None = None):
-        """
-        List other molecule widgets from a list which collides with atoms from this CMoleculeWidget.
-        :param others: List of other CMoleculeWidgets.
-        :param col: Optional, alternative col for this molecule.
-        :param row: Optional, alternative row for this molecule.
-        :return: List of all colliding other molecule widgets.
-        """
-        col = col if col is not None else self.col
-        row = row if row is not None else self.row
-        colliders = []
-        for o in others:
-            if type(o) is type(self):
-                rel_pos = (o.col - col, o.row - row)
-                if self.molecule.collides_with(o.molecule, rel_pos):
-                    colliders.append(o)
-
-        return colliders
-
-
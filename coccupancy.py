@@ -0,0 +1,235 @@
+from cmolecule import CMolecule
+
+
+class COccupancy:
+    """
+    Cell occupancy index of a grid (e.g., of a reactor). COccupancy maps each cell to the owner (e.g., a molecule widget)
+    of the atom in this cell. Collision queries only inspect the cells a molecule would occupy. The atoms of different
+    owners must not overlap.
+    """
+
+    def __init__(self, cols: int, rows: int):
+        """
+        Creates an empty occupancy index.
+        :param cols: Number of columns.
+        :param rows: Number of rows.
+        """
+        self.cols = cols
+        self.rows = rows
+        self.cells: list = [None] * (cols * rows)
+        self.masks: list[int] = [0] * rows
+        """
+        Occupancy bitmask for each row with bit x set if cell (x, y) is occupied.
+        """
+        self.skyline: list[int] = [0] * cols
+        """
+        Height for each column: The highest occupied row + 1, or 0 if the column is empty.
+        """
+        self.owners: dict = {}
+        """
+        Molecule, position, and occupied cell indices for each owner.
+        """
+        self.version: int = 0
+        """
+        Change counter, increased upon each change of the index.
+        """
+
+    def clear(self):
+        """
+        Removes all owners.
+        """
+        self.cells = [None] * (self.cols * self.rows)
+        self.masks = [0] * self.rows
+        self.skyline = [0] * self.cols
+        self.owners = {}
+        self.version += 1
+
+    def add(self, owner, molecule: CMolecule, col: int, row: int):
+        """
+        Adds the atoms of a molecule to the index. Atoms outside the grid are ignored.
+        :param owner: Owner object (e.g., a CMoleculeWidget).
+        :param molecule: CMolecule of the owner.
+        :param col: X position of molecule in blocks.
+        :param row: Y position of molecule in blocks.
+        """
+        if owner in self.owners:
+            self.remove(owner)
+
+        indices = []
+        w = molecule.dim[0]
+        for i, atom in enumerate(molecule.data):
+            if atom:
+                x = col + i % w
+                y = row + i // w
+                if (0 <= x < self.cols) and (0 <= y < self.rows):
+                    index = y * self.cols + x
+                    self.cells[index] = owner
+                    self.masks[y] |= 1 << x
+                    self.skyline[x] = max(self.skyline[x], y + 1)
+                    indices.append(index)
+        self.owners.update({owner: (molecule, col, row, indices)})
+        self.version += 1
+
+    def remove(self, owner):
+        """
+        Removes the atoms of an owner from the index.
+        :param owner: Owner object.
+        """
+        if owner in self.owners:
+            self.version += 1
+            __, __, __, indices = self.owners.pop(owner)
+            tops = []
+            for index in indices:
+                if self.cells[index] is owner:
+                    y, x = divmod(index, self.cols)
+                    self.cells[index] = None
+                    self.masks[y] &= ~(1 << x)
+                    if self.skyline[x] == y + 1:
+                        tops.append(x)
+
+            # Lower the skyline of the columns which lost their top atom
+            for x in tops:
+                y = self.skyline[x] - 1
+                while (y >= 0) and not (self.masks[y] >> x) & 1:
+                    y -= 1
+                self.skyline[x] = y + 1
+
+    def move(self, owner, col: int, row: int):
+        """
+        Moves the atoms of an owner in the index.
+        :param owner: Owner object.
+        :param col: New X position in blocks.
+        :param row: New Y position in blocks.
+        """
+        if owner in self.owners:
+            molecule, __, __, __ = self.owners[owner]
+            self.add(owner, molecule, col, row)
+
+    def get(self, col: int, row: int):
+        """
+        Gets the owner of the atom in a cell.
+        :param col: X position in blocks.
+        :param row: Y position in blocks.
+        :return: Owner object or None, if empty or outside the grid.
+        """
+        if (0 <= col < self.cols) and (0 <= row < self.rows):
+            return self.cells[row * self.cols + col]
+        return None
+
+    def get_legal_columns(self, dim: tuple[int, int], masks: tuple[int, ...], row: int):
+        """
+        Gets all columns where a molecule fits into the grid and doesn't collide with any atom in the index, in a single
+        pass over the shifted row bitmasks.
+        :param dim: Dimension of the molecule.
+        :param masks: Row bitmasks of the molecule, see CMolecule.get_masks().
+        :param row: Y position of the molecule in blocks.
+        :return: Bitmask with bit x set if the molecule can be placed at column x.
+        """
+        if (row < 0) or (row + dim[1] > self.rows) or (dim[0] > self.cols):
+            return 0
+
+        legal = 0
+        for col in range(self.cols - dim[0] + 1):
+            if not any(self.masks[row + y] & (mask << col) for y, mask in enumerate(masks)):
+                legal |= 1 << col
+        return legal
+
+    def get_landing_row(self, molecule: CMolecule, col: int, row: int):
+        """
+        Gets the row where a molecule comes to rest if dropped straight down from its position. The landing row is
+        derived from the skyline in O(width). Only if the molecule is below an overhang, it is dropped row by row.
+        :param molecule: CMolecule to drop. It must not collide at its position.
+        :param col: X position of molecule in blocks.
+        :param row: Y position of molecule in blocks.
+        :return: Landing row (<= row).
+        """
+
+        # Step 1: Lowest row where each atom column is above the skyline
+        landing = 0
+        for x, bottom in enumerate(molecule.get_bottoms()):
+            if (bottom is not None) and (0 <= col + x < self.cols):
+                landing = max(landing, self.skyline[col + x] - bottom)
+        if landing <= row:
+            return landing
+
+        # Step 2: Below an overhang: Drop by 1 row until collision
+        while (row > 0) and not self.test_collision(molecule, col, row - 1):
+            row -= 1
+        return row
+
+    def test_collision(self, molecule: CMolecule, col: int, row: int, ignore=()):
+        """
+        Tests if the atoms of a molecule collide with any atom in the index.
+        :param molecule: CMolecule to test.
+        :param col: X position of molecule in blocks.
+        :param row: Y position of molecule in blocks.
+        :param ignore: Optional, owners to ignore.
+        :return: True if collision, otherwise False.
+        """
+        if ignore:
+            return bool(self.list_colliders(molecule, col, row, ignore))
+
+        for y, mask in enumerate(molecule.get_masks()):
+            r = row + y
+            if (0 <= r < self.rows) and (self.masks[r] & (mask << col if col >= 0 else mask >> -col)):
+                return True
+
+        return False
+
+    def list_colliders(self, molecule: CMolecule, col: int, row: int, ignore=()):
+        """
+        Lists all owners with atoms colliding with the atoms of a molecule.
+        :param molecule: CMolecule to test.
+        :param col: X position of molecule in blocks.
+        :param row: Y position of molecule in blocks.
+        :param ignore: Optional, owners to ignore.
+        :return: List of colliding owners.
+        """
+        colliders = []
+        for y, mask in enumerate(molecule.get_masks()):
+            r = row + y
+            if 0 <= r < self.rows:
+                overlap = self.masks[r] & (mask << col if col >= 0 else mask >> -col)
+                while overlap:
+                    x = (overlap & -overlap).bit_length() - 1
+                    owner = self.cells[r * self.cols + x]
+                    if (owner not in colliders) and (owner not in ignore):
+                        colliders.append(owner)
+                    overlap &= overlap - 1
+
+        return colliders
+
+    def list_neighbors(self, molecule: CMolecule, col: int, row: int, ignore=()):
+        """
+        Lists all owners with atoms in the cells bordering (left, right, below, above) the atoms of a molecule.
+        :param molecule: CMolecule to test.
+        :param col: X position of molecule in blocks.
+        :param row: Y position of molecule in blocks.
+        :param ignore: Optional, owners to ignore.
+        :return: List of neighboring owners.
+        """
+        neighbors = []
+        masks = molecule.get_masks()
+        h = len(masks)
+        for y in range(-1, h + 1):
+            r = row + y
+            if 0 <= r < self.rows:
+                # Grow the atoms of this and the adjacent rows by one cell (shifted by 1 to keep col - 1) without the
+                # atoms themselves
+                mask = masks[y] if 0 <= y < h else 0
+                grown = (mask << 2) | mask
+                if y > 0:
+                    grown |= masks[y - 1] << 1
+                if y + 1 < h:
+                    grown |= masks[y + 1] << 1
+                grown &= ~(mask << 1)
+
+                overlap = self.masks[r] & (grown << (col - 1) if col >= 1 else grown >> (1 - col))
+                while overlap:
+                    x = (overlap & -overlap).bit_length() - 1
+                    owner = self.cells[r * self.cols + x]
+                    if (owner not in neighbors) and (owner not in ignore):
+                        neighbors.append(owner)
+                    overlap &= overlap - 1
+
+        return neighbors
@@ -0,0 +1,47 @@
+from cmolecule import CMolecule
+from coccupancy import COccupancy
+
+
+class CPlacementTable:
+    """
+    Table of the legal placements (column, orientation) of a molecule with precomputed orientations at a fixed row of
+    an occupancy index. A placement is legal if the molecule in this orientation fits into the grid and doesn't collide.
+    The table becomes invalid once the index changes, see is_valid().
+    """
+
+    def __init__(self, occupancy: COccupancy, molecule: CMolecule, row: int):
+        """
+        Computes the legal placements for all orientations of a molecule.
+        :param occupancy: COccupancy index (e.g., of a reactor).
+        :param molecule: CMolecule with precomputed orientations, see CMolecule.create_orientations().
+        :param row: Y position of the molecule in blocks.
+        """
+        self.occupancy = occupancy
+        self.row = row
+        self.version = occupancy.version
+        self.molecule = molecule
+        self.columns: list[int] = [occupancy.get_legal_columns(*molecule.get_orientation_masks(orientation), row)
+                                   for orientation in range(CMolecule.ORIENTATIONS)]
+        """
+        Bitmask of the legal columns for each orientation index.
+        """
+
+    def is_valid(self, molecule: CMolecule, row: int):
+        """
+        Tests if the table applies to a molecule at a row.
+        :param molecule: CMolecule.
+        :param row: Y position of the molecule in blocks.
+        :return: True, if the molecule is an orientation of the tabulated molecule, at the same row, and the index
+        didn't change since. Otherwise, False.
+        """
+        return (molecule.shares_orientations(self.molecule) and (row == self.row) and
+                (self.occupancy.version == self.version))
+
+    def is_legal(self, col: int, orientation: int):
+        """
+        Looks up if a placement is legal.
+        :param col: X position of the molecule in blocks.
+        :param orientation: Orientation index 0..7, see CMolecule.get_orientation().
+        :return: True, if legal. Otherwise, False.
+        """
+        return (col >= 0) and bool((self.columns[orientation % CMolecule.ORIENTATIONS] >> col) & 1)
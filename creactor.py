@@ -1,127 +1,92 @@
-from kivy.graphics import Color, Line, InstructionGroup
+from kivy.graphics import Color, InstructionGroup, Mesh
+from kivy.properties import NumericProperty
 from kivy.uix.relativelayout import RelativeLayout
 
+from cgameengine import CGameEngine
 from cmolecule import CMolecule
 from cmoleculewidget import CMoleculeWidget
 
 
 class CReactor(RelativeLayout):
     """
-    CReactor is a layout widget which hosts all molecule widgets except act. It provides methods for the interaction
-    with its child molecule widgets.
+    CReactor is a layout widget which hosts all molecule widgets except act. It only lays out its child molecule
+    widgets, the game rules (incl. the occupancy of the reactor) are implemented in CGameEngine. The dimension (cols,
+    rows) is set per instance, see set_dimension().
     """
     COLS = 8
     ROWS = 16
+    MAX_COLS = CGameEngine.MAX_COLS
+    MAX_ROWS = CGameEngine.MAX_ROWS
+
+    cols = NumericProperty(COLS)
+    rows = NumericProperty(ROWS)
 
     grid = None
+    grid_mesh = None
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.bind(pos=self.update, size=self.update)
 
-    def draw_canvas(self):
-        if self.grid is not None: self.grid.clear()
-        self.grid = InstructionGroup()
-        self.grid.add(Color(1, 1, 1, 0.05))
-        for c in range(1, self.COLS):
-            self.grid.add(Line(points=[c * self.width / self.COLS, 0.1 * self.height / self.ROWS,
-                                       c * self.width / self.COLS, (self.ROWS - 0.1) * self.height / self.ROWS], width=1))
-        for r in range(1, self.ROWS):
-            self.grid.add(Line(points=[0.1 * self.width / self.COLS, r * self.height / self.ROWS,
-                                       (self.COLS - 0.1) * self.width / self.COLS, r * self.height / self.ROWS], width=1))
-        self.canvas.before.add(self.grid)
-
-    def update(self, *args):
-        self.draw_canvas()
-        for child in self.children:
-            if type(child) is CMoleculeWidget:
-                child.pos = self.x + self.width * child.col / self.COLS, self.y + child.row * self.height / self.ROWS
-                child.size = (self.width * child.cols / self.COLS, self.height * child.rows / self.ROWS)
-
-    def fits(self, molecule:CMolecule, col, row):
+    def set_dimension(self, cols: int, rows: int):
         """
-        Tests if molecule fits into this CRector object (without collision detection).
-        :param molecule: CMolecule to test.
-        :param col: X position of molecule in blocks.
-        :param row: Y position of molecule in blocks.
-        :return: True, if molecule fits, otherwise False.
+        Sets the number of columns and rows. Removes all child molecule widgets if the dimension changes.
+        :param cols: Number of columns 1..MAX_COLS.
+        :param rows: Number of rows 1..MAX_ROWS.
         """
-        return (col >= 0) and (row >= 0) and (col + molecule.dim[0] <= self.COLS) and (row + molecule.dim[1] <= self.ROWS)
+        if not ((1 <= cols <= self.MAX_COLS) and (1 <= rows <= self.MAX_ROWS)):
+            raise ValueError("Invalid reactor dimension " + str(cols) + "x" + str(rows) + ".")
 
-    def test_collision(self, molecule:CMolecule, col, row):
-        """
-        Tests if any child CMoleculeWidget collides with the atoms of the provided molecule.
-        :param molecule: CMolecule to test.
-        :param col: X position of molecule in blocks.
-        :param row: XYposition of molecule in blocks.
-        :return: True if collision, otherwise False.
-        """
-        for child in self.children:
-            if type(child) is CMoleculeWidget:
-                rel_pos = (child.col - col, child.row - row)
-                if molecule.collides_with(child.molecule, rel_pos):
-                    return True
+        if (cols, rows) != (self.cols, self.rows):
+            self.clear_widgets()
+            self.cols = cols
+            self.rows = rows
+            self.update()
 
-        return False
-
-    def list_colliders(self, molecule:CMolecule, col, row):
+    def set_child_molecule(self, widget: CMoleculeWidget, molecule: CMolecule, col: int, row: int):
         """
-        List all child widgets which collide with atoms from the provided molecule.
-        :param molecule: CMolecule to test.
-        :param col: X position of molecule in blocks.
-        :param row: XYposition of molecule in blocks.
-        :return: List of all colliding child widgets.
+        Replaces the molecule of a child molecule widget and moves the widget.
+        :param widget: Child CMoleculeWidget.
+        :param molecule: New CMolecule.
+        :param col: New X position in blocks.
+        :param row: New Y position in blocks.
         """
-        colliders = []
-        for child in self.children:
-            if type(child) is CMoleculeWidget:
-                rel_pos = (child.col - col, child.row - row)
-                if molecule.collides_with(child.molecule, rel_pos):
-                    colliders.append(child)
+        widget.set_molecule(molecule)
+        widget.move_to(col, row)
+        self.place_child(widget)
 
-        return colliders
-
-    def list_molecule_widgets_if_floating(self, molecule_widget: CMoleculeWidget):
+    def draw_canvas(self):
         """
-        Lists all molecule widgets connected to the provided molecule widget if not directly or indirectly connected to
-        the ground.
-        :param molecule_widget: CMoleculeWidget.
-        :return: List of CMoleculeWidgets.
+        Draws the grid lines as a single mesh. The mesh is created once and only its vertices are updated afterward.
         """
+        if self.grid is None:
+            self.grid = InstructionGroup()
+            self.grid.add(Color(1, 1, 1, 0.05))
+            self.grid_mesh = Mesh(mode="lines")
+            self.grid.add(self.grid_mesh)
+            self.canvas.before.add(self.grid)
+
+        # Vertices (x, y, u, v) for both end points of each line
+        w = self.width / self.cols
+        h = self.height / self.rows
+        vertices = []
+        for c in range(1, self.cols):
+            vertices.extend((c * w, 0.1 * h, 0, 0, c * w, (self.rows - 0.1) * h, 0, 0))
+        for r in range(1, self.rows):
+            vertices.extend((0.1 * w, r * h, 0, 0, (self.cols - 0.1) * w, r * h, 0, 0))
+        self.grid_mesh.vertices = vertices
+        self.grid_mesh.indices = list(range(len(vertices) // 4))
 
-        def __list_molecule_widgets_if_floating_recursive__(molecule_widget: CMoleculeWidget, others:list, group:list):
-            # Already on ground?
-            if molecule_widget.row == 0:
-                return None
-
-            # Add molecule widget to group
-            group.append(molecule_widget)
-
-            # Remove molecule widget from others (otherwise it would collide with itself)
-            if molecule_widget in others:
-                others.remove(molecule_widget)
-
-            # Get colliding molecule widgets if moved 1 step down
-            colliders = molecule_widget.list_colliders(others, row=molecule_widget.row - 1)
-
-            # And the same procedure for all molecule widgets in contact with molecule_widget
-            # TODO Needs to be validated, further use of n_widgets
-            for c in colliders:
-                n_widgets = __list_molecule_widgets_if_floating_recursive__(c, others, group)
-                if n_widgets is None:
-                    return None
-
-            return group
-
-        others = self.children.copy()
-        group = []
-        result = __list_molecule_widgets_if_floating_recursive__(molecule_widget, others, group)
-        return group if result else []
+    def update(self, *args):
+        self.draw_canvas()
+        for child in self.children:
+            if type(child) is CMoleculeWidget:
+                self.place_child(child)
 
-    def delocalize_free_bonds(self):
+    def place_child(self, widget: CMoleculeWidget):
         """
-        Moves all free bonds for the respective atom for all atoms. This simulates electron delocalization.
+        Sets position and size of a child molecule widget from its col, row, cols, and rows.
+        :param widget: Child CMoleculeWidget.
         """
-        for child in self.children:
-            if type(child) is CMoleculeWidget:
-                child.delocalize_free_bonds()
\ No newline at end of file
+        widget.pos = self.x + self.width * widget.col / self.cols, self.y + widget.row * self.height / self.rows
+        widget.size = (self.width * widget.cols / self.cols, self.height * widget.rows / self.rows)
@@ -0,0 +1,270 @@
+from bisect import bisect_right
+from json import dumps as dump_json_str, loads as load_json_str
+
+from cgameengine import CGameEngine
+
+
+class CReplayWriter:
+    """
+    Streams a game into a seekable replay file. The file consists of lines:
+    "H <json>": Header (version, engine settings, keyframe interval).
+    "K <json>": Keyframe, the complete engine state before a step, see CGameEngine.get_state().
+    "I <delta> <commands>": Player commands of a step, delta steps after the previous keyframe or command line. The
+    commands are indices of CGameEngine.COMMANDS separated by ",".
+    "R <json>": Final engine state (time, score, nr_molecules).
+    "X <json>": Index, list of [time, byte offset] of all keyframes.
+    "E <offset>": Byte offset of the index line.
+    Replay files of unfinished games (no index) remain readable, see CReplayReader.
+    """
+
+    VERSION = 1
+    INTERVAL = 1200
+    """
+    Default number of steps between two keyframes (30 seconds).
+    """
+
+    def __init__(self, filename: str, settings: dict, interval: int = INTERVAL):
+        """
+        Creates a replay file and writes the header.
+        :param filename: Filename.
+        :param settings: Engine settings, see CGameEngine.settings.
+        :param interval: Number of steps between two keyframes.
+        """
+        if interval < 1:
+            raise ValueError("Keyframe interval must be positive.")
+
+        self.filename = filename
+        self.interval = interval
+        self.keyframes: list[list[int]] = []
+        """
+        List of [time, byte offset] of the written keyframes.
+        """
+        self._file = open(filename, "wb")
+        self._last = 0
+        self._next_keyframe = 0
+        self._write("H", dump_json_str({"version": self.VERSION, "settings": settings, "interval": interval}))
+
+    def _write(self, key: str, data: str):
+        """
+        Writes a line.
+        :param key: Line type.
+        :param data: Line content.
+        :return: Byte offset of the line.
+        """
+        offset = self._file.tell()
+        self._file.write((key + " " + data + "\n").encode("utf8"))
+        return offset
+
+    def record(self, engine: CGameEngine, inputs: list[str]):
+        """
+        Records the player commands of the next step. Writes a keyframe first if due. Keyframes are delayed while a
+        cleanup round is in progress.
+        :param engine: CGameEngine before the step.
+        :param inputs: Player commands.
+        """
+        if self._file is None:
+            return
+
+        # Step 1: Keyframe
+        if (engine.time >= self._next_keyframe) and engine.is_stable():
+            offset = self._write("K", dump_json_str(engine.get_state(), separators=(",", ":")))
+            self.keyframes.append([engine.time, offset])
+            self._last = engine.time
+            self._next_keyframe = engine.time + self.interval
+
+        # Step 2: Delta-encoded commands
+        if inputs:
+            self._write("I", str(engine.time - self._last) + " " +
+                        ",".join(str(CGameEngine.COMMANDS.index(command)) for command in inputs))
+            self._last = engine.time
+
+    def close(self, engine: CGameEngine | None = None):
+        """
+        Writes the final engine state and the index, and closes the file.
+        :param engine: Optional, CGameEngine of the finished game.
+        """
+        if self._file is None:
+            return
+
+        if engine is not None:
+            self._write("R", dump_json_str({"time": engine.time, "score": engine.score,
+                                            "nr_molecules": engine.nr_molecules}))
+        offset = self._write("X", dump_json_str(self.keyframes))
+        self._write("E", str(offset))
+        self._file.close()
+        self._file = None
+
+
+class CReplayReader:
+    """
+    Reads replay files, see CReplayWriter. Seeking restores the engine from the nearest keyframe and only re-simulates
+    the steps from there. Only the header and the index are kept in memory, the commands are streamed from the file.
+    """
+
+    def __init__(self, filename: str):
+        """
+        Opens a replay file and reads the header and the index. The index is rebuilt by a scan if the file wasn't closed.
+        :param filename: Filename.
+        :raises ValueError: If the file isn't a replay file of a supported version.
+        """
+        self.filename = filename
+        self._file = open(filename, "rb")
+
+        # Step 1: Header
+        key, data = self._read_line()
+        header = load_json_str(data) if key == "H" else {}
+        if header.get("version") != CReplayWriter.VERSION:
+            self._file.close()
+            raise ValueError("Unsupported replay version " + str(header.get("version")) + ".")
+        self.settings: dict = header["settings"]
+        self.interval: int = header["interval"]
+        self.keyframes: list[list[int]] = []
+        """
+        List of [time, byte offset] of all keyframes.
+        """
+        self.result: dict = {}
+        """
+        Final engine state (time, score, nr_molecules). Empty if the game wasn't finished.
+        """
+        self._ticks = 0
+
+        # Step 2: Index and result via the trailer
+        self._file.seek(0, 2)
+        size = self._file.tell()
+        self._file.seek(max(0, size - 32))
+        tail = self._file.read().rstrip(b"\n").rsplit(b"\n", 1)[-1]
+        if tail.startswith(b"E "):
+            self._file.seek(int(tail[2:]))
+            for key, data in iter(self._read_line, ("", "")):
+                if key == "X":
+                    self.keyframes = load_json_str(data)
+                    break
+            if self.keyframes:
+                self._file.seek(self.keyframes[-1][1])
+                self._scan(index=False)
+
+        # Step 3: Otherwise scan the whole file
+        if not self.keyframes:
+            self._file.seek(0)
+            self._scan()
+
+        if not self.keyframes:
+            self._file.close()
+            raise ValueError("Replay without keyframes.")
+
+    def _read_line(self):
+        """
+        Reads the next line.
+        :return: Tuple (line type, line content). ("", "") at the end of the file.
+        """
+        line = self._file.readline()
+        if not line.endswith(b"\n"):
+            return "", ""
+        key, _, data = line.decode("utf8").rstrip("\n").partition(" ")
+        return key, data
+
+    def _scan(self, index=True):
+        """
+        Scans the file from the current position for keyframes, commands, and the result.
+        :param index: If True (default), adds the keyframes to the index. Otherwise, only counts the steps.
+        """
+        while True:
+            offset = self._file.tell()
+            key, data = self._read_line()
+            if key in ("", "X", "E"):
+                return
+            if key == "R":
+                self.result = load_json_str(data)
+            elif key == "K":
+                self._ticks = load_json_str(data)["time"]
+                if index:
+                    self.keyframes.append([self._ticks, offset])
+            elif key == "I":
+                self._ticks += int(data.split(" ")[0])
+
+    def close(self):
+        """
+        Closes the file.
+        """
+        self._file.close()
+
+    def get_ticks(self):
+        """
+        Gets the number of recorded steps.
+        :return: Number of steps. For unfinished games, up to the last recorded commands.
+        """
+        return self.result["time"] if self.result else self._ticks + 1
+
+    def _iter_commands(self, time: int):
+        """
+        Streams the player commands from the current file position, which must be the keyframe line at a time.
+        :param time: Engine time of the keyframe.
+        :return: Endless generator of the lists of player commands for each step from the keyframe on.
+        """
+        tick = time
+        base = time
+        for key, data in iter(self._read_line, ("", "")):
+            if key == "K":
+                base = load_json_str(data)["time"]
+                continue
+            if key != "I":
+                break
+
+            delta, commands = data.split(" ")
+            base += int(delta)
+            while tick < base:
+                yield []
+                tick += 1
+            yield [CGameEngine.COMMANDS[int(index)] for index in commands.split(",")]
+            tick += 1
+
+        while True:
+            yield []
+
+    def _restore(self, tick: int, fragments: list[dict], bonus_molecules: list[dict]):
+        """
+        Restores the engine from the nearest keyframe at or before a time.
+        :param tick: Engine time.
+        :param fragments: List of fragment dicts, see CGameEngine.
+        :param bonus_molecules: List of bonus molecule dicts, see CGameEngine.
+        :return: Tuple (CGameEngine, generator of the player commands from the keyframe on, see _iter_commands()).
+        """
+        time, offset = self.keyframes[max(0, bisect_right(self.keyframes, [tick, float("inf")]) - 1)]
+        self._file.seek(offset)
+        engine = CGameEngine(fragments, bonus_molecules, **self.settings)
+        engine.set_state(load_json_str(self._read_line()[1]))
+        self._file.seek(offset)
+        return engine, self._iter_commands(time)
+
+    def replay(self, fragments: list[dict], bonus_molecules: list[dict], start: int = 0, stop: int | None = None):
+        """
+        Replays the recorded game from a start time as fast as possible. The steps between the nearest keyframe and the
+        start time are re-simulated silently. Don't seek while a replay is in progress, the commands are streamed from
+        the file.
+        :param fragments: List of fragment dicts, see CGameEngine.
+        :param bonus_molecules: List of bonus molecule dicts, see CGameEngine.
+        :param start: Engine time to start from.
+        :param stop: Optional, engine time to stop at. Default is the end of the recording.
+        :return: Generator of tuples (CGameEngine, list of events) after each step from the start time on.
+        """
+        ticks = self.get_ticks()
+        stop = ticks if stop is None else min(stop, ticks)
+        engine, commands = self._restore(start, fragments, bonus_molecules)
+        while (engine.time < stop) and not engine.over:
+            events = engine.step(next(commands))
+            if engine.time > start:
+                yield engine, events
+
+    def seek(self, tick: int, fragments: list[dict], bonus_molecules: list[dict]):
+        """
+        Restores the engine state at a time of the recorded game.
+        :param tick: Engine time.
+        :param fragments: List of fragment dicts, see CGameEngine.
+        :param bonus_molecules: List of bonus molecule dicts, see CGameEngine.
+        :return: CGameEngine at the time (or at the end of the recording, if earlier).
+        """
+        engine, commands = self._restore(tick, fragments, bonus_molecules)
+        stop = min(tick, self.get_ticks())
+        while (engine.time < stop) and not engine.over:
+            engine.step(next(commands))
+        return engine
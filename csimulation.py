@@ -0,0 +1,296 @@
+import sys
+from argparse import ArgumentParser
+from multiprocessing import Pool, cpu_count
+from random import Random
+from time import perf_counter
+
+from cgamedata import DATA_PATH, load_game_data
+from cgameengine import CGameEngine
+from cmolecule import CMolecule
+
+_fragments: list[dict] = []
+_bonus_molecules: list[dict] = []
+"""
+Game data of a worker process, see init_worker().
+"""
+
+
+class CPolicy:
+    """
+    Input policy for headless games: Provides the player commands for each step of a CGameEngine. The base class never
+    issues any command.
+    """
+
+    def get_inputs(self, engine: CGameEngine):
+        """
+        Gets the player commands for the next step.
+        :param engine: CGameEngine before the step.
+        :return: List of player commands, see CGameEngine.COMMANDS.
+        """
+        return []
+
+
+class CRandomPolicy(CPolicy):
+    """
+    Issues a random command (except grab and release) with a fixed probability in each step.
+    """
+
+    COMMANDS = ("left", "right", "flip", "rotate", "drop", "hard_drop")
+
+    def __init__(self, seed=None, rate=0.3):
+        """
+        Creates a random policy.
+        :param seed: Optional, seed of the random generator.
+        :param rate: Probability of a command per step.
+        """
+        self.random = Random(seed)
+        self.rate = rate
+
+    def get_inputs(self, engine: CGameEngine):
+        return [self.random.choice(self.COMMANDS)] if self.random.random() < self.rate else []
+
+
+class CScriptedPolicy(CPolicy):
+    """
+    Issues the commands of a script cyclically, one entry per step. A script entry "-" means no command.
+    """
+
+    def __init__(self, script: list[str]):
+        """
+        Creates a scripted policy.
+        :param script: List of commands (see CGameEngine.COMMANDS) or "-".
+        :raises ValueError: If the script is empty or contains unknown commands.
+        """
+        if not script:
+            raise ValueError("Empty script.")
+        for command in script:
+            if (command != "-") and (command not in CGameEngine.COMMANDS):
+                raise ValueError("Unknown command " + str(command) + ".")
+
+        self.script = list(script)
+        self.index = 0
+
+    @classmethod
+    def load(cls, filename: str):
+        """
+        Loads a script from a text file with whitespace-separated commands.
+        :param filename: Filename.
+        :return: CScriptedPolicy.
+        """
+        with open(filename, "r", encoding="utf8") as read_file:
+            return cls(read_file.read().split())
+
+    def get_inputs(self, engine: CGameEngine):
+        command = self.script[self.index]
+        self.index = (self.index + 1) % len(self.script)
+        return [] if command == "-" else [command]
+
+
+class CBotPolicy(CPolicy):
+    """
+    Greedy bot: Chooses a target placement (column, orientation) for each new act and steers act there, one command per
+    step, then hard drops it. The target maximizes the number of connectable neighbors at the landing position, then
+    minimizes the landing row.
+    """
+
+    def __init__(self):
+        self.act = None
+        self.target = None
+        self.last = None
+
+    def choose_target(self, engine: CGameEngine):
+        """
+        Evaluates all legal placements of act at its row.
+        :param engine: CGameEngine.
+        :return: Tuple (column, orientation index) or None, if act has no precomputed orientations.
+        """
+        act = engine.act
+        placements = engine.update_placements()
+        if placements is None:
+            return None
+
+        phase = act.molecule.get_orientation_phase()
+        best = None
+        for orientation in range(CMolecule.ORIENTATIONS):
+            molecule = act.molecule.get_orientation(orientation, phase)
+            for col in range(engine.cols):
+                if not placements.is_legal(col, orientation):
+                    continue
+
+                row = engine.support.get_landing_row(molecule, col, act.row)
+                connections = 0
+                for piece in engine.support.list_neighbors(molecule, col, row):
+                    if molecule.copy().connect(piece.molecule, (piece.col - col, piece.row - row)):
+                        connections += 1
+                rating = (connections, -row, -abs(col - act.col))
+                if (best is None) or (rating > best[0]):
+                    best = (rating, (col, orientation))
+
+        return None if best is None else best[1]
+
+    def get_inputs(self, engine: CGameEngine):
+        act = engine.act
+        if (not act.molecule) or (act.job != "play"):
+            return []
+
+        # Step 1: New act
+        if act is not self.act:
+            self.act = act
+            self.target = self.choose_target(engine)
+            self.last = None
+        if self.target is None:
+            return ["hard_drop"]
+
+        # Step 2: Give up steering if the previous command was blocked
+        col, orientation = self.target
+        state = (act.col, act.molecule.get_orientation_index())
+        if state == self.last:
+            return ["hard_drop"]
+        self.last = state
+
+        # Step 3: Steer to the target orientation, then to the target column
+        if (state[1] >= 4) != (orientation >= 4):
+            return ["flip"]
+        if state[1] != orientation:
+            return ["rotate"]
+        if act.col < col:
+            return ["right"]
+        if act.col > col:
+            return ["left"]
+        return ["hard_drop"]
+
+
+POLICIES = {"random": CRandomPolicy, "scripted": CScriptedPolicy, "bot": CBotPolicy}
+
+
+def create_policy(name: str, seed=None, script: list[str] | None = None):
+    """
+    Creates an input policy.
+    :param name: Policy name, see POLICIES.
+    :param seed: Optional, seed for random policies.
+    :param script: List of commands for scripted policies.
+    :return: CPolicy.
+    :raises ValueError: If the policy is unknown.
+    """
+    if name == "random":
+        return CRandomPolicy(seed)
+    if name == "scripted":
+        return CScriptedPolicy(script or [])
+    if name == "bot":
+        return CBotPolicy()
+    raise ValueError("Unknown policy " + str(name) + ".")
+
+
+def init_worker(data_path=DATA_PATH, fragments_filename="fragments.json", bonus_filename="bonus.json"):
+    """
+    Loads the game data once per worker process.
+    :param data_path: See load_game_data().
+    :param fragments_filename: See load_game_data().
+    :param bonus_filename: See load_game_data().
+    """
+    global _fragments, _bonus_molecules
+    _fragments, _bonus_molecules = load_game_data(data_path, fragments_filename, bonus_filename)
+
+
+def create_game(job: dict):
+    """
+    Creates the engine and the input policy of a headless game. Requires init_worker() before.
+    :param job: Dict with seed, policy (name), script (for scripted policies), and optional engine settings (cols, rows,
+    nr_molecules).
+    :return: Tuple (CGameEngine, CPolicy).
+    """
+    settings = {key: job[key] for key in ("cols", "rows", "nr_molecules") if key in job}
+    return (CGameEngine(_fragments, _bonus_molecules, seed=job["seed"], **settings),
+            create_policy(job["policy"], job["seed"], job.get("script")))
+
+
+def simulate_game(job: dict):
+    """
+    Runs a headless game until game over or the tick limit.
+    :param job: Dict with seed, policy (name), script (for scripted policies), ticks (limit or 0 for no limit), and
+    optional engine settings (cols, rows, nr_molecules). Requires init_worker() before.
+    :return: Dict with the job and the result: time, score, nr_molecules, over, and seconds.
+    """
+    engine, policy = create_game(job)
+    ticks = job.get("ticks", 0)
+
+    t = perf_counter()
+    while (not engine.over) and ((not ticks) or (engine.time < ticks)):
+        engine.step(policy.get_inputs(engine))
+
+    result = dict(job)
+    result.update({"time": engine.time, "score": engine.score, "nr_molecules": engine.nr_molecules,
+                   "over": engine.over, "seconds": perf_counter() - t})
+    return result
+
+
+def run_jobs(jobs: list[dict], processes=None, data_path=DATA_PATH, fragments_filename="fragments.json",
+             bonus_filename="bonus.json", worker=simulate_game):
+    """
+    Runs a worker function (default: simulate_game()) for a list of jobs spread across a pool of worker processes.
+    :param jobs: List of job dicts, see simulate_game().
+    :param processes: Number of worker processes. Default is the number of cores.
+    :param data_path: See load_game_data().
+    :param fragments_filename: See load_game_data().
+    :param bonus_filename: See load_game_data().
+    :param worker: Module-level function taking a job dict and returning a result.
+    :return: Generator of results (see simulate_game()) in the order of completion.
+    """
+    processes = min(processes or cpu_count(), len(jobs)) or 1
+    with Pool(processes, initializer=init_worker, initargs=(data_path, fragments_filename, bonus_filename)) as pool:
+        yield from pool.imap_unordered(worker, jobs)
+
+
+def main(argv=None):
+    """
+    Command line entry point for batch simulation, e.g.:
+    python chon.py --simulate 100 --policy bot --ticks 20000
+    :param argv: Command line arguments (without program name).
+    :return: Exit code.
+    """
+    parser = ArgumentParser(prog="chon.py --simulate", description="Runs headless CHON games without Kivy.")
+    parser.add_argument("--simulate", type=int, default=1, metavar="N", help="number of games")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game, then incremented")
+    parser.add_argument("--seeds", type=int, nargs="+", help="explicit seeds (instead of --simulate and --seed)")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random", help="input policy")
+    parser.add_argument("--script", help="text file with whitespace-separated commands for the scripted policy, "
+                                         "\"-\" for no command")
+    parser.add_argument("--ticks", type=int, default=0, help="tick limit per game (default: no limit)")
+    parser.add_argument("--processes", type=int, help="number of worker processes (default: number of cores)")
+    parser.add_argument("--cols", type=int, default=CGameEngine.COLS, help="reactor columns")
+    parser.add_argument("--rows", type=int, default=CGameEngine.ROWS, help="reactor rows")
+    args = parser.parse_args(argv)
+    if not ((1 <= args.cols <= CGameEngine.MAX_COLS) and (1 <= args.rows <= CGameEngine.MAX_ROWS)):
+        parser.error("reactor dimension must be 1..{}x1..{}".format(CGameEngine.MAX_COLS, CGameEngine.MAX_ROWS))
+
+    script = None
+    if args.policy == "scripted":
+        if not args.script:
+            parser.error("the scripted policy requires --script")
+        try:
+            script = CScriptedPolicy.load(args.script).script
+        except OSError as err:
+            parser.error("can't read the script {}: {}".format(args.script, err))
+
+    seeds = args.seeds if args.seeds else range(args.seed, args.seed + args.simulate)
+    jobs = [{"seed": seed, "policy": args.policy, "script": script, "ticks": args.ticks,
+             "cols": args.cols, "rows": args.rows} for seed in seeds]
+
+    t = perf_counter()
+    ticks = 0
+    cpu_seconds = 0.0
+    for result in run_jobs(jobs, args.processes):
+        ticks += result["time"]
+        cpu_seconds += result["seconds"]
+        print("seed {}: {} ticks, score {}, {} molecules, {}, {:.2f} s".format(
+            result["seed"], result["time"], result["score"], result["nr_molecules"],
+            "game over" if result["over"] else "tick limit", result["seconds"]))
+    seconds = perf_counter() - t
+
+    print("{} games, {} ticks in {:.2f} s: {:.0f} ticks/s ({:.0f} ticks/s per process)".format(
+        len(jobs), ticks, seconds, ticks / seconds if seconds else 0.0, ticks / cpu_seconds if cpu_seconds else 0.0))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
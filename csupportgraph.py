@@ -0,0 +1,181 @@
+from cmolecule import CMolecule
+from coccupancy import COccupancy
+
+
+class CSupportGraph(COccupancy):
+    """
+    Cell occupancy index with a "rests on" graph between the owners and the floor. An owner rests on another owner if
+    one of its atoms is directly above an atom of the other owner. An owner is grounded if it is on the floor (row 0) or
+    if it rests on a grounded owner. The set of grounded owners is updated incrementally upon add, remove, and move.
+    Thus, floating queries are (nearly) constant time.
+    """
+
+    def __init__(self, cols: int, rows: int):
+        """
+        Creates an empty support graph.
+        :param cols: Number of columns.
+        :param rows: Number of rows.
+        """
+        super().__init__(cols, rows)
+        self.rests_on: dict = {}
+        """
+        Set of the owners directly below for each owner.
+        """
+        self.supports: dict = {}
+        """
+        Set of the owners directly above for each owner.
+        """
+        self.grounded: set = set()
+
+    def clear(self):
+        """
+        Removes all owners.
+        """
+        super().clear()
+        self.rests_on = {}
+        self.supports = {}
+        self.grounded = set()
+
+    def add(self, owner, molecule: CMolecule, col: int, row: int):
+        """
+        Adds the atoms of a molecule to the index and links the owner in the support graph.
+        :param owner: Owner object (e.g., a CMoleculeWidget).
+        :param molecule: CMolecule of the owner.
+        :param col: X position of molecule in blocks.
+        :param row: Y position of molecule in blocks.
+        """
+        if owner in self.owners:
+            self.remove(owner)
+        super().add(owner, molecule, col, row)
+
+        # Step 1: Link with the owners directly below and above
+        below = set()
+        above = set()
+        for index in self.owners[owner][3]:
+            if index >= self.cols:
+                other = self.cells[index - self.cols]
+                if (other is not None) and (other is not owner):
+                    below.add(other)
+            if index + self.cols < len(self.cells):
+                other = self.cells[index + self.cols]
+                if (other is not None) and (other is not owner):
+                    above.add(other)
+        self.rests_on.update({owner: below})
+        self.supports.update({owner: above})
+        for other in below:
+            self.supports[other].add(owner)
+        for other in above:
+            self.rests_on[other].add(owner)
+
+        # Step 2: Ground this owner and all owners resting on it
+        if (row <= 0) or (below & self.grounded):
+            self.ground([owner])
+
+    def remove(self, owner):
+        """
+        Removes the atoms of an owner from the index and unlinks the owner from the support graph. Owners which rested
+        on this owner may lose their ground.
+        :param owner: Owner object.
+        """
+        if owner not in self.owners:
+            return
+
+        super().remove(owner)
+        below = self.rests_on.pop(owner)
+        above = self.supports.pop(owner)
+        for other in below:
+            self.supports[other].discard(owner)
+        for other in above:
+            self.rests_on[other].discard(owner)
+
+        if owner in self.grounded:
+            self.grounded.remove(owner)
+
+            # Step 1: All owners above lose ground, if grounded via this owner
+            lost = set()
+            stack = [other for other in above if other in self.grounded]
+            while stack:
+                other = stack.pop()
+                if other in self.grounded:
+                    self.grounded.remove(other)
+                    lost.add(other)
+                    stack.extend(self.supports[other])
+
+            # Step 2: Ground them again, if they are on the floor or rest on other grounded owners
+            self.ground([other for other in lost
+                         if (self.owners[other][2] <= 0) or (self.rests_on[other] & self.grounded)])
+
+    def ground(self, owners):
+        """
+        Marks owners and all owners (directly or indirectly) resting on them as grounded.
+        :param owners: List of owners.
+        """
+        stack = list(owners)
+        while stack:
+            owner = stack.pop()
+            if owner not in self.grounded:
+                self.grounded.add(owner)
+                stack.extend(other for other in self.supports[owner] if other not in self.grounded)
+
+    def is_floating(self, owner):
+        """
+        Tests if an owner is neither directly nor indirectly resting on the floor.
+        :param owner: Owner object.
+        :return: True if floating, otherwise False.
+        """
+        return (owner in self.owners) and (owner not in self.grounded)
+
+    def has_floating(self):
+        """
+        Tests if any owner is floating.
+        :return: True if at least one owner is floating, otherwise False.
+        """
+        return len(self.grounded) < len(self.owners)
+
+    def list_floating(self):
+        """
+        Lists all floating owners.
+        :return: List of floating owners.
+        """
+        return [owner for owner in self.owners if owner not in self.grounded] if self.has_floating() else []
+
+    def get_floating_drop(self):
+        """
+        Gets the number of rows all floating owners can drop together until the first of them rests on a grounded owner
+        or on the floor. Floating owners don't block each other as they drop together.
+        :return: Number of rows. 0 if no owner is floating.
+        """
+        if not self.has_floating():
+            return 0
+
+        # Step 1: Column bitmasks with bit y set if cell (x, y) is occupied by a grounded owner
+        columns = [0] * self.cols
+        for owner in self.grounded:
+            for index in self.owners[owner][3]:
+                y, x = divmod(index, self.cols)
+                columns[x] |= 1 << y
+
+        # Step 2: Minimum number of free cells below a floating atom
+        drop = self.rows
+        for owner in self.list_floating():
+            for index in self.owners[owner][3]:
+                y, x = divmod(index, self.cols)
+                drop = min(drop, y - (columns[x] & ((1 << y) - 1)).bit_length())
+        return drop
+
+    def get_floating_group(self, owner):
+        """
+        Gets the group of floating owners resting on each other, including the provided owner.
+        :param owner: Owner object.
+        :return: List of floating owners. Empty if the provided owner is not floating.
+        """
+        if not self.is_floating(owner):
+            return []
+
+        group = [owner]
+        for member in group:
+            for other in self.rests_on[member] | self.supports[member]:
+                if (other not in group) and (other not in self.grounded):
+                    group.append(other)
+
+        return group
@@ -12,6 +12,13 @@ def char_to_bond(char):
 
     return 0
 
+def bond_to_char(bond, vertical=False):
+    bond_symbols = {1: ['-', '|'],
+                    2: ['=', '‖'],
+                    3: ['≡', '⦀']}
+
+    return bond_symbols[bond][1 if vertical else 0] if bond in bond_symbols else ' '
+
 def dict_get_or_create(dict, *args):
     if args and (not args[0] in dict):
         dict.update({args[0]: {}})
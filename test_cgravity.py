@@ -0,0 +1,52 @@
+import unittest
+from os.path import join
+
+from cgamedata import DATA_PATH, load_atoms, load_game_data
+from cgameengine import CGameEngine, CPiece
+from cgravity import CBody, CGravity
+from cmolecule import CMolecule
+
+
+class TestDropAndMerge(unittest.TestCase):
+    """
+    A floating body drops onto a lower body and merges with it. The merged molecule starts at the row of the lower body,
+    but the dropped body must only drop to its resting row.
+    """
+
+    def setUp(self):
+        atoms = load_atoms(join(DATA_PATH, "atoms.json"))
+        self.carbon = CMolecule(atoms=atoms, txt=["C"])
+        self.oxygen = CMolecule(atoms=atoms, txt=["O"])
+
+    def test_gravity_rests(self):
+        lower = CBody(self.carbon, 2, 0)
+        upper = CBody(self.oxygen, 2, 5)
+        result = CGravity(8, 16).step([upper, lower])
+
+        self.assertEqual(result["drops"], {upper: 4})
+        self.assertEqual(result["rests"], {upper: 1})
+        self.assertEqual(result["merges"], [(upper, lower)])
+        self.assertEqual((upper.col, upper.row), (2, 0))
+
+    def test_engine_no_overlap(self):
+        fragments, bonus_molecules = load_game_data()
+        engine = CGameEngine(fragments, bonus_molecules, seed=0)
+        lower = CPiece(self.carbon.copy(), 2, 0)
+        upper = CPiece(self.oxygen.copy(), 2, 5)
+        engine.add_piece(lower)
+        engine.add_piece(upper)
+
+        rows = []
+        while engine.drop_pieces():
+            cells = [(piece.col + x, piece.row + y) for piece in engine.pieces
+                     for x, y in piece.molecule.get_atom_positions()]
+            self.assertEqual(len(cells), len(set(cells)))
+            rows.append(upper.row)
+
+        self.assertEqual(rows[:4], [4, 3, 2, 1])
+        self.assertEqual(len(engine.pieces), 1)
+        self.assertEqual(engine.support.get(2, 0), engine.pieces[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from os.path import join
+
+from cmolecule import CMolecule
+from cgamedata import DATA_PATH, load_atoms
+
+
+class TestCopyOnWrite(unittest.TestCase):
+    """
+    Molecules share atoms until they change them in place.
+    """
+
+    def setUp(self):
+        self.atoms = load_atoms(join(DATA_PATH, "atoms.json"))
+
+    def test_add_unshares(self):
+        molecule = CMolecule(atoms=self.atoms, txt=["C"])
+        other = CMolecule(atoms=self.atoms, txt=["O"])
+        molecule.add(other, (1, 0))
+        line = molecule.to_line()
+
+        other.delocalize_free_bonds()
+        self.assertEqual(molecule.to_line(), line)
+        molecule.delocalize_free_bonds()
+        self.assertNotEqual(molecule.to_line(), line)
+        self.assertEqual(other.to_line()[-4:], molecule.to_line()[-4:])
+
+    def test_copy_unshares(self):
+        molecule = CMolecule(atoms=self.atoms, txt=["C=O"])
+        copy = molecule.copy()
+        line = molecule.to_line()
+
+        copy.delocalize_free_bonds()
+        self.assertEqual(molecule.to_line(), line)
+
+
+class TestText(unittest.TestCase):
+    """
+    Formatted text round trip, see CMolecule.to_text() and CMolecule.parse().
+    """
+
+    def setUp(self):
+        self.atoms = load_atoms(join(DATA_PATH, "atoms.json"))
+
+    def test_rows_without_vertical_bonds(self):
+        molecule = CMolecule(atoms=self.atoms, txt=["C-C"])
+        molecule.add(CMolecule(atoms=self.atoms, txt=["O"]), (0, 1))
+        txt = molecule.to_text()
+        parsed = CMolecule(atoms=self.atoms, txt=txt)
+
+        self.assertEqual(parsed.dim, (2, 2))
+        self.assertEqual(parsed.to_text(), txt)
+
+
+if __name__ == "__main__":
+    unittest.main()